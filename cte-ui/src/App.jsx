@@ -80,7 +80,8 @@ function App() {
         
         switch(msg.type) {
           case 'status':
-              if (msg.msg && msg.msg.includes("Started")) {
+              // The server announces a run with "🚀 Starting <DEPTH> Analysis..."
+              if (msg.msg && msg.msg.includes("Starting")) {
                   setLogs([]); setPlans([]); setReviews([]); setSynthesis(null); 
                   setAgentConfigs([]); setEvidence([]); setDivergence(0); setProvenance(null);
                   setIteration(0); setRouterDecision('pending'); setSmartConfig(null);
@@ -110,6 +111,7 @@ function App() {
           case 'plans': setPlans(msg.data || []); break;
           case 'contradiction_types': setAgentConfigs(msg.data || []); break; 
           case 'research_evidence': setEvidence(msg.data || []); break;
+          case 'evidence_chunk': setEvidence(prev => [...prev, ...(msg.data || [])]); setActiveStage('swarm'); break;
           case 'reviews': setReviews(msg.data || []); break;
           case 'dialectic_results': if (msg.data) { setDivergence(msg.data.divergence); setProvenance(msg.data.provenance); } break;
           
@@ -121,6 +123,9 @@ function App() {
               }
               break;
               
+          case 'result_chunk':
+              setSynthesis(prev => (prev || '') + (msg.data || '')); setActiveStage('synthesizer'); break;
+
           case 'result': 
               setSynthesis(msg.data); setStatus('COMPLETE'); setActiveStage('synthesizer'); setRouterDecision('synthesize'); break;
               
@@ -132,6 +137,8 @@ function App() {
 
   const handleRun = (taskQuery, complexity, hitlEnabled, tempMode, depthMode) => {
     setHasStarted(true);
+    // Chunk frames append to the previous value, so the last run's brief and evidence must be gone first
+    setSynthesis(null); setEvidence([]);
     sendMessage(JSON.stringify({ 
         query: taskQuery, 
         complexity: complexity,
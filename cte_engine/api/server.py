@@ -1,16 +1,23 @@
 # FILE: cte_engine/api/server.py
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.websockets import WebSocketState
-from core.workflow import cte_graph, set_human_input_queue
+from core.workflow import cte_graph, set_human_input_queue, generate_runbook
 from core.state import CTEState
 from storage.mongo import mongo_db
+from storage.vectordb import vector_db
+from util.metrics import render_latest, RUNS_ABORTED, RUN_CANCEL_DURATION
+from util.http import http_clients
+from util.cancellation import RunScope
+from util.config_loader import settings
 import uvicorn
 import json
 import traceback
 import numpy as np
 import datetime
 import asyncio
+import time
+from contextlib import aclosing
 
 app = FastAPI(title="CTE Engine")
 
@@ -51,6 +58,17 @@ async def safe_send(websocket: WebSocket, type_str: str, data: dict = None, msg:
 async def startup_event():
     print("🚀 CTE Engine Starting...")
     await mongo_db.connect()
+    await http_clients.startup()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await vector_db.close()
+    await http_clients.aclose()
+
+@app.get("/api/metrics")
+async def get_metrics():
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/api/runs")
 async def get_runs():
@@ -64,6 +82,121 @@ async def get_run_details(run_id: str):
         raise HTTPException(status_code=404, detail="Run not found")
     return json.loads(json.dumps(run, cls=SafeEncoder))
 
+async def stream_run(websocket: WebSocket, initial_state: CTEState, partial: dict) -> bool:
+    """
+    Streams one graph run to the client. Top-level updates are folded into `partial` so an
+    abandoned run can still be saved. Raises WebSocketDisconnect when a send fails; returns
+    False if the client left right after the run completed.
+    """
+    # Closed explicitly, so a failed send tears down the graph's in-flight nodes right away
+    stream = cte_graph.astream(initial_state, {"recursion_limit": 100}, stream_mode=["updates", "custom"], subgraphs=True)
+    async with aclosing(stream):
+        async for namespace, mode, event in stream:
+            # Custom events are incremental frames emitted mid-node (e.g. synthesis chunks)
+            if mode == "custom":
+                if not await safe_send(websocket, event["type"], data=event.get("data")):
+                    raise WebSocketDisconnect
+                continue
+
+            for node_name, state_update in event.items():
+                # Latest top-level values, for the aborted runbook (logs are streamed, not saved)
+                if not namespace and state_update:
+                    partial.update({k: v for k, v in state_update.items() if k != "logs"})
+                # The research subgraph's own nodes (contradiction, swarm) were already reported
+                if not namespace and node_name == "research":
+                    continue
+                if not state_update:
+                    continue
+                        
+                if "logs" in state_update:
+                    for log_entry in state_update["logs"]:
+                        if not await safe_send(websocket, "log", msg=log_entry, data={"node": node_name}):
+                            raise WebSocketDisconnect
+
+                if node_name == "router":
+                    decision = state_update.get("router_decision")
+                    if decision == "human_review":
+                        if not await safe_send(websocket, "hitl_request", data={
+                            "msg": "High ambiguity detected. Please steer the strategy.",
+                            "options": ["Prioritize Risk", "Prioritize Innovation", "Refine Arguments", "Inject Chaos"]
+                        }): raise WebSocketDisconnect
+
+                if "llm_config" in state_update and state_update["llm_config"]:
+                    if not await safe_send(websocket, "config_report", data={
+                        "nature": state_update.get("detected_nature"),
+                        "config": state_update.get("llm_config")
+                    }): raise WebSocketDisconnect
+
+                if node_name == "divergence":
+                    div_score = state_update.get("divergence_score", 0.0)
+                    prov_data = state_update.get("provenance", {})
+                    if not await safe_send(websocket, "dialectic_results", data={"divergence": div_score, "provenance": prov_data}):
+                        raise WebSocketDisconnect
+
+                if "iteration_count" in state_update:
+                     if not await safe_send(websocket, "recursion_update", data={
+                        "iteration": state_update.get("iteration_count"),
+                        "max_iterations": state_update.get("max_iterations"),
+                        "decision": state_update.get("router_decision")
+                     }): raise WebSocketDisconnect
+
+                for key in ["plans", "contradiction_types", "research_evidence", "reviews"]:
+                    if key in state_update:
+                        if not await safe_send(websocket, key, data=state_update[key]):
+                            raise WebSocketDisconnect
+                        
+                if "synthesis" in state_update:
+                    if not await safe_send(websocket, "result", data=state_update["synthesis"]):
+                        raise WebSocketDisconnect
+                        
+                if "run_id" in state_update:
+                    if not await safe_send(websocket, "saved", data=state_update["run_id"]):
+                        raise WebSocketDisconnect
+
+    return await safe_send(websocket, "status", msg="✨ Analysis Complete.")
+
+async def read_client(websocket: WebSocket, input_queue: asyncio.Queue, scope: RunScope):
+    """Reads the socket while a run is in flight: HITL answers go to the queue, a disconnect cancels the run."""
+    while True:
+        try:
+            data = await websocket.receive_text()
+        except Exception:
+            scope.cancel("client_disconnected")
+            return
+        try:
+            req = json.loads(data)
+        except ValueError:
+            continue
+        if req.get("type") == "human_response":
+            print(f"📥 Received HITL Response: {req.get('decision')}")
+            await input_queue.put(req.get("decision", "continue"))
+        else:
+            # One run per connection: the query is refused visibly instead of vanishing
+            print("⚠️ Rejecting request received while a run is in progress.")
+            await safe_send(websocket, "error", msg="A run is already in progress. Wait for it to finish, then resend the query.")
+
+async def abort_run(scope: RunScope, partial: dict):
+    """Cancels everything the run started, waits (bounded) for it to unwind and saves what it had."""
+    start = time.perf_counter()
+    scope.cancel("client_disconnected")
+    if not await scope.wait(settings.RUN_CANCEL_TIMEOUT):
+        print(f"⚠️ Run still unwinding after {settings.RUN_CANCEL_TIMEOUT:.0f}s. Saving partial results anyway.")
+    RUN_CANCEL_DURATION.observe(time.perf_counter() - start)
+    RUNS_ABORTED.labels(reason=scope.reason).inc()
+
+    run_data = generate_runbook(
+        partial["task"],
+        partial["plans"],
+        partial["reviews"],
+        partial["divergence_score"],
+        partial["synthesis"],
+        "aborted",
+        partial.get("provenance")
+    )
+    run_data["abort_reason"] = scope.reason
+    run_id = await mongo_db.save_run(run_data)
+    print(f"🛑 Run aborted ({scope.reason}). Partial results saved: {run_id}")
+
 @app.websocket("/ws/analyze")
 async def websocket_endpoint(websocket: WebSocket):
     try:
@@ -139,6 +272,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 detected_nature="Analyzing...",
                 config_rationale="Initializing...",
                 report_template="",
+                speculative_template=None,
                 iteration_count=0,
                 max_iterations=max_iters,
                 router_decision="pending",
@@ -147,74 +281,43 @@ async def websocket_endpoint(websocket: WebSocket):
                 plans=[],
                 contradiction_types=[],
                 research_evidence=[],
+                evidence_index=None,
+                pending_research=[],
                 reviews=[],
                 divergence_score=0.0,
                 provenance={},
+                centrality_vector={},
                 synthesis="",
                 run_id=None,
                 logs=[]
             )
             
+            # The run executes in its own cancellation scope while the socket keeps being read,
+            # so HITL answers arrive mid-run and a disconnect cancels all in-flight work
+            scope = RunScope()
+            partial = dict(initial_state)
+            run = scope.start(stream_run(websocket, initial_state, partial))
+            reader = asyncio.create_task(read_client(websocket, input_queue, scope))
             try:
-                async for event in cte_graph.astream(initial_state, {"recursion_limit": 100}):
-                    for node_name, state_update in event.items():
-                        
-                        if "logs" in state_update:
-                            for log_entry in state_update["logs"]:
-                                if not await safe_send(websocket, "log", msg=log_entry, data={"node": node_name}):
-                                    raise WebSocketDisconnect
-
-                        if node_name == "router":
-                            decision = state_update.get("router_decision")
-                            if decision == "human_review":
-                                if not await safe_send(websocket, "hitl_request", data={
-                                    "msg": "High ambiguity detected. Please steer the strategy.",
-                                    "options": ["Prioritize Risk", "Prioritize Innovation", "Refine Arguments", "Inject Chaos"]
-                                }): raise WebSocketDisconnect
-
-                        if "llm_config" in state_update and state_update["llm_config"]:
-                            if not await safe_send(websocket, "config_report", data={
-                                "nature": state_update.get("detected_nature"),
-                                "config": state_update.get("llm_config")
-                            }): raise WebSocketDisconnect
-
-                        if node_name == "divergence":
-                            div_score = state_update.get("divergence_score", 0.0)
-                            prov_data = state_update.get("provenance", {})
-                            if not await safe_send(websocket, "dialectic_results", data={"divergence": div_score, "provenance": prov_data}):
-                                raise WebSocketDisconnect
-
-                        if "iteration_count" in state_update:
-                             if not await safe_send(websocket, "recursion_update", data={
-                                "iteration": state_update.get("iteration_count"),
-                                "max_iterations": state_update.get("max_iterations"),
-                                "decision": state_update.get("router_decision")
-                             }): raise WebSocketDisconnect
-
-                        for key in ["plans", "contradiction_types", "research_evidence", "reviews"]:
-                            if key in state_update:
-                                if not await safe_send(websocket, key, data=state_update[key]):
-                                    raise WebSocketDisconnect
-                        
-                        if "synthesis" in state_update:
-                            if not await safe_send(websocket, "result", data=state_update["synthesis"]):
-                                raise WebSocketDisconnect
-                        
-                        if "run_id" in state_update:
-                            if not await safe_send(websocket, "saved", data=state_update["run_id"]):
-                                raise WebSocketDisconnect
-
-                if not await safe_send(websocket, "status", msg="✨ Analysis Complete."):
+                if not await run:
                     break
-
-            except WebSocketDisconnect:
+            except (WebSocketDisconnect, asyncio.CancelledError) as e:
+                if isinstance(e, asyncio.CancelledError) and not scope.cancelled:
+                    # The endpoint itself is being cancelled (server shutdown)
+                    scope.cancel("server_shutdown")
+                    raise
                 print("⚠️ Client Disconnected during workflow")
+                await abort_run(scope, partial)
                 break
             except Exception as graph_error:
                 print(f"❌ Graph Execution Error: {graph_error}")
                 traceback.print_exc()
                 await safe_send(websocket, "error", msg=f"Workflow Error: {str(graph_error)}")
                 break
+            finally:
+                reader.cancel()
+                # Stragglers or an unused speculative template nobody will collect any more
+                scope.close()
 
     except WebSocketDisconnect:
         print("⚠️ Client Disconnected")
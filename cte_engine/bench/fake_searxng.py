@@ -0,0 +1,109 @@
+# FILE: cte_engine/bench/fake_searxng.py
+"""
+Local stand-in for a SearxNG instance with misbehaving engines (stdlib only).
+
+    python -m bench.fake_searxng --port 8888 --blocked google,bing --slow brave=2.0 --failing qwant
+
+Serves /search?q=...&engines=<engine>&format=json. Blocked engines answer 200 with a
+CAPTCHA page (like SearxNG does), failing engines answer 500, slow engines sleep first.
+Point SEARXNG_URL at it to exercise SearchManager's engine health handling.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import threading
+import time
+
+class FakeSearxNG:
+    def __init__(self, blocked=(), slow=None, failing=(), host: str = "127.0.0.1", port: int = 0):
+        self.blocked = set(blocked)
+        self.slow = dict(slow or {})
+        self.failing = set(failing)
+        self.requests = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = parse_qs(parsed.query)
+                query = params.get("q", [""])[0]
+                engine = params.get("engines", ["default"])[0]
+                fake.requests.append(engine)
+
+                if parsed.path != "/search":
+                    return self._send(404, "text/plain", b"not found")
+                time.sleep(fake.slow.get(engine, 0.0))
+                if engine in fake.blocked:
+                    return self._send(200, "text/html", b"<html><body>CAPTCHA required</body></html>")
+                if engine in fake.failing:
+                    return self._send(500, "text/plain", b"engine error")
+
+                results = [{
+                    "title": f"{engine} result {i} for {query}",
+                    "url": f"https://{engine}.example/{i}",
+                    "content": f"Snippet {i} from {engine} about {query}.",
+                } for i in range(8)]
+                self._send(200, "application/json", json.dumps({"query": query, "results": results}).encode())
+
+            def _send(self, status: int, content_type: str, body: bytes):
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (e.g. a cancelled hedge)
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def parse_engine_list(value: str) -> list:
+    return [e for e in (value or "").split(",") if e]
+
+def parse_slow(value: str) -> dict:
+    return {name: float(delay) for name, delay in (item.split("=") for item in parse_engine_list(value))}
+
+def add_engine_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--blocked", default="", help="Comma-separated engines that answer with a CAPTCHA.")
+    parser.add_argument("--slow", default="", help="Comma-separated engine=seconds delays.")
+    parser.add_argument("--failing", default="", help="Comma-separated engines that answer 500.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake SearxNG with slow / blocked engines.")
+    parser.add_argument("--port", type=int, default=8888)
+    add_engine_args(parser)
+    args = parser.parse_args()
+
+    fake = FakeSearxNG(parse_engine_list(args.blocked), parse_slow(args.slow), parse_engine_list(args.failing), port=args.port)
+    print(f"🧪 Fake SearxNG listening on {fake.url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        fake.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+# FILE: cte_engine/bench/run_graph.py
+"""
+End-to-end benchmark for cte_graph.
+
+Record a cassette once against the live API, then replay it offline:
+
+    python -m bench.run_graph --mode record --corpus bench/tasks.json
+    python -m bench.run_graph --mode replay --corpus bench/tasks.json --latency-scale 1.0
+    python -m bench.run_graph --mode replay --latency-scale 1.0 --graph both
+
+Search results are recorded and replayed alongside the LLM cassette (<cassette>.search.jsonl),
+and replay runs use an in-process Qdrant, no Redis tier and no MongoDB, so a replay is hermetic:
+no engine requests, jitter sleeps or connection timeouts end up in the node timings.
+
+Reports wall-clock time per node, OODA loops until convergence and peak memory.
+--graph both runs the sequential and the fan-out/fan-in topology on the same tasks and
+compares wall-clock per analysis pass (one pass = one divergence evaluation).
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEPTH_TO_ITERS = {"quick": 2, "standard": 3, "deep": 6}
+
+# A fixed system context keeps prompts (and therefore replay hashes) stable across runs.
+BENCH_SYSTEM_CONTEXT = (
+    "SYSTEM AWARENESS:\n"
+    "- Current Date: Benchmark\n"
+    "- Operational Context: You are a recursive AI engine running in benchmark mode.\n"
+    "- Mode: Autonomous\n"
+)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the CTE OODA graph.")
+    parser.add_argument("--corpus", default=str(BENCH_DIR / "tasks.json"), help="JSON list of task specs.")
+    parser.add_argument("--mode", choices=["replay", "record", "live"], default="replay")
+    parser.add_argument("--cassette", default=str(BENCH_DIR / "cassettes" / "default.jsonl"))
+    parser.add_argument("--search-cassette", default=None, help="Defaults to the LLM cassette path with .search.jsonl.")
+    parser.add_argument("--latency-scale", type=float, default=0.0, help="Replay latency multiplier (0 = instant).")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per task.")
+    parser.add_argument("--graph", choices=["parallel", "sequential", "both"], default="parallel", help="Graph topology.")
+    parser.add_argument("--trace-memory", action="store_true", help="Track peak Python heap with tracemalloc (slower).")
+    parser.add_argument("--output", default=None, help="Optional path for a JSON report.")
+    return parser.parse_args()
+
+def build_initial_state(spec: dict):
+    from core.state import CTEState
+
+    depth_mode = spec.get("depth_mode", "standard")
+    return CTEState(
+        task=spec["task"],
+        complexity=int(spec.get("complexity", 5)),
+        system_context=spec.get("system_context", BENCH_SYSTEM_CONTEXT),
+        hitl_enabled=False,
+        human_feedback="",
+        manual_temp_mode=spec.get("temp_mode"),
+        recursion_depth_mode=depth_mode,
+        llm_config=None,
+        detected_nature="Analyzing...",
+        config_rationale="Initializing...",
+        report_template="",
+        speculative_template=None,
+        iteration_count=0,
+        max_iterations=DEPTH_TO_ITERS.get(depth_mode, 3),
+        router_decision="pending",
+        feedback_log=[],
+        temperature=0.7,
+        plans=[],
+        contradiction_types=[],
+        research_evidence=[],
+        evidence_index=None,
+        pending_research=[],
+        reviews=[],
+        divergence_score=0.0,
+        provenance={},
+        centrality_vector={},
+        synthesis="",
+        run_id=None,
+        logs=[]
+    )
+
+def node_latency_totals():
+    """(seconds, calls) per node from NODE_LATENCY; valid when branches overlap, unlike update gaps."""
+    from util.metrics import NODE_LATENCY
+
+    totals = defaultdict(lambda: [0.0, 0])
+    for metric in NODE_LATENCY.collect():
+        for sample in metric.samples:
+            node = sample.labels.get("node")
+            if sample.name.endswith("_sum"):
+                totals[node][0] += sample.value
+            elif sample.name.endswith("_count"):
+                totals[node][1] += int(sample.value)
+    return totals
+
+async def run_once(graph, spec: dict, trace_memory: bool, graph_name: str = "parallel"):
+    iterations = 0
+    decisions = []
+
+    if trace_memory:
+        tracemalloc.start()
+
+    before = node_latency_totals()
+    start = time.perf_counter()
+    async for event in graph.astream(build_initial_state(spec), {"recursion_limit": 100}):
+        for node_name, state_update in event.items():
+            if state_update and "iteration_count" in state_update:
+                iterations = state_update["iteration_count"]
+            if node_name == "router" and state_update:
+                decisions.append(state_update.get("router_decision"))
+    wall = time.perf_counter() - start
+    after = node_latency_totals()
+    node_seconds = {n: after[n][0] - before[n][0] for n in after if after[n][1] > before[n][1]}
+    node_calls = {n: after[n][1] - before[n][1] for n in node_seconds}
+    passes = node_calls.get("divergence", 0)
+
+    peak_heap = None
+    if trace_memory:
+        _, peak_heap = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "task": spec["task"][:60],
+        "graph": graph_name,
+        "wall_seconds": wall,
+        "iterations": iterations,
+        "passes": passes,
+        "seconds_per_pass": wall / passes if passes else None,
+        "decisions": decisions,
+        "node_seconds": node_seconds,
+        "node_calls": node_calls,
+        "peak_heap_mb": peak_heap / (1024 * 1024) if peak_heap is not None else None,
+    }
+
+def reset_process_caches():
+    """
+    Every run starts cold: the critic and plan-score memos and the in-process LLM / search
+    result caches would otherwise turn the second run of identical replayed plans into memo
+    hits, and --graph both would credit the later topology with the savings.
+    (Redis tiers are off in replay mode; in live/record mode disable them for comparisons.)
+    """
+    from core.meta_critic import critic
+    from core.scoring import advanced_scorer
+    from llm_providers.gemini import response_cache
+    from search.manager import search_manager
+
+    critic._reviews.clear()
+    advanced_scorer._plan_memo.clear()
+    response_cache.clear()
+    search_manager.results_cache.clear()
+
+def speculative_template_counts():
+    from util.metrics import SPECULATIVE_TEMPLATES
+
+    counts = defaultdict(int)
+    for metric in SPECULATIVE_TEMPLATES.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                counts[sample.labels["outcome"]] += int(sample.value)
+    return counts
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+def print_report(results: list, llm, search=None):
+    print("\n" + "=" * 72)
+    print("📊 CTE Graph Benchmark")
+    print("=" * 72)
+    for r in results:
+        heap = f" | heap peak {r['peak_heap_mb']:.1f} MB" if r["peak_heap_mb"] is not None else ""
+        per_pass = f" | {r['seconds_per_pass']:.3f}s/pass" if r["seconds_per_pass"] else ""
+        print(f"\n▶ [{r['graph']}] {r['task']}")
+        print(f"  wall {r['wall_seconds']:.3f}s | loops {r['iterations']}{per_pass} | decisions {r['decisions']}{heap}")
+        for node, secs in sorted(r["node_seconds"].items(), key=lambda x: -x[1]):
+            calls = r["node_calls"][node]
+            print(f"    {node:<18} {secs:8.3f}s  ({calls}x, {secs / calls:.3f}s avg)")
+
+    totals = defaultdict(float)
+    for r in results:
+        for node, secs in r["node_seconds"].items():
+            totals[node] += secs
+    print("\n" + "-" * 72)
+    print(f"Total wall: {sum(r['wall_seconds'] for r in results):.3f}s over {len(results)} runs")
+    for node, secs in sorted(totals.items(), key=lambda x: -x[1]):
+        print(f"  {node:<18} {secs:8.3f}s")
+    print_topology_comparison(results)
+    speculative = speculative_template_counts()
+    if speculative:
+        tried = speculative["hit"] + speculative["wasted"]
+        print(f"Speculative templates: {speculative['hit']}/{tried} hits ({speculative['hit'] / tried:.0%}), {speculative['wasted']} wasted")
+    print(f"Peak RSS: {peak_rss_mb():.1f} MB")
+    if hasattr(llm, "hits"):
+        print(f"Replay: {llm.hits} hits / {llm.misses} misses")
+    if hasattr(search, "hits"):
+        print(f"Search replay: {search.hits} hits / {search.misses} misses")
+
+def print_topology_comparison(results: list):
+    by_graph = defaultdict(list)
+    for r in results:
+        if r["seconds_per_pass"]:
+            by_graph[r["graph"]].append(r["seconds_per_pass"])
+    if "sequential" not in by_graph or "parallel" not in by_graph:
+        return
+    seq = sum(by_graph["sequential"]) / len(by_graph["sequential"])
+    par = sum(by_graph["parallel"]) / len(by_graph["parallel"])
+    print("-" * 72)
+    print(f"Per-pass wall: sequential {seq:.3f}s | parallel {par:.3f}s | saved {seq - par:.3f}s ({(seq - par) / seq:.0%})")
+
+async def main():
+    args = parse_args()
+
+    # Must be set before the providers are imported, they are built at import time.
+    os.environ["LLM_MODE"] = args.mode
+    os.environ["LLM_CASSETTE_PATH"] = args.cassette
+    os.environ["LLM_REPLAY_LATENCY_SCALE"] = str(args.latency_scale)
+    if args.mode == "replay":
+        # Nothing in a replay may leave the process (explicit env settings still win)
+        os.environ.setdefault("QDRANT_URL", ":memory:")
+        os.environ.setdefault("LLM_CACHE_REDIS", "false")
+        os.environ.setdefault("SEARCH_CACHE_REDIS", "false")
+
+    from core.workflow import build_cte_graph
+    from llm_providers.gemini import llm
+    from search.manager import search_manager
+    from storage.mongo import mongo_db
+    from bench import search_replay
+
+    search_cassette = args.search_cassette or str(Path(args.cassette).with_suffix(".search.jsonl"))
+    search = search_replay.install(search_manager, args.mode, search_cassette, args.latency_scale)
+    if args.mode == "replay":
+        async def skip_save(run_data):
+            return "bench_replay"
+        # The storage node would otherwise pay a MongoDB connection timeout per run
+        mongo_db.save_run = skip_save
+
+    topologies = ["sequential", "parallel"] if args.graph == "both" else [args.graph]
+    graphs = {name: build_cte_graph(parallel=name == "parallel") for name in topologies}
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    results = []
+    for spec in corpus:
+        for _ in range(args.repeat):
+            for name, graph in graphs.items():
+                if hasattr(llm, "rewind"):
+                    llm.rewind()
+                if hasattr(search, "rewind"):
+                    search.rewind()
+                reset_process_caches()
+                results.append(await run_once(graph, spec, args.trace_memory, name))
+
+    print_report(results, llm, search)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": results, "peak_rss_mb": peak_rss_mb()}, f, indent=2)
+        print(f"💾 Report written to {args.output}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
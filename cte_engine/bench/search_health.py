@@ -0,0 +1,76 @@
+# FILE: cte_engine/bench/search_health.py
+"""
+SearchManager against the local fake SearxNG (see bench/fake_searxng.py).
+
+    python -m bench.search_health --queries 20 --blocked google,bing --slow brave=2.0,qwant=0.4 --failing duckduckgo
+
+Runs the same queries in sequential and hedged mode with a fresh scoreboard each,
+and reports per-query latency and how many requests each engine received.
+No Redis, no result cache hits (every query is distinct).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+def parse_args():
+    from bench.fake_searxng import add_engine_args
+
+    parser = argparse.ArgumentParser(description="Benchmark search engine health handling.")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--modes", default="sequential,hedged")
+    add_engine_args(parser)
+    return parser.parse_args()
+
+async def run_mode(mode: str, url: str, fake, queries: int):
+    from search.manager import SearchManager
+    from util.http import http_clients
+
+    manager = SearchManager()
+    manager.searx_url = url
+    manager.hedged = mode == "hedged"
+    start_requests = len(fake.requests)
+
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        await manager.search(f"{mode} benchmark query {i}", limit=5)
+        latencies.append(time.perf_counter() - start)
+
+    # Pooled connections belong to this event loop
+    await http_clients.aclose()
+    return {
+        "mode": mode,
+        "first": latencies[0],
+        "mean": statistics.mean(latencies),
+        "p95": sorted(latencies)[max(0, int(0.95 * len(latencies)) - 1)],
+        "requests": Counter(fake.requests[start_requests:]),
+    }
+
+def print_report(results: list):
+    print(f"\n{'mode':<12}{'first':>9}{'mean':>9}{'p95':>9}  requests per engine")
+    for r in results:
+        per_engine = ", ".join(f"{e}={n}" for e, n in r["requests"].most_common())
+        print(f"{r['mode']:<12}{r['first']:>8.2f}s{r['mean']:>8.2f}s{r['p95']:>8.2f}s  {per_engine}")
+
+def main():
+    args = parse_args()
+    # Keep the run hermetic: no Redis tier, and the LLM fallback never reached with healthy engines left
+    os.environ.setdefault("SEARCH_CACHE_REDIS", "false")
+    os.environ.setdefault("LLM_CACHE_REDIS", "false")
+
+    from bench.fake_searxng import FakeSearxNG, parse_engine_list, parse_slow
+
+    fake = FakeSearxNG(parse_engine_list(args.blocked), parse_slow(args.slow), parse_engine_list(args.failing))
+    url = fake.start()
+    print(f"🧪 Fake SearxNG on {url}")
+    try:
+        results = [asyncio.run(run_mode(mode, url, fake, args.queries)) for mode in args.modes.split(",")]
+    finally:
+        fake.stop()
+    print_report(results)
+
+if __name__ == "__main__":
+    main()
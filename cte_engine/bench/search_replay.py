@@ -0,0 +1,88 @@
+# FILE: cte_engine/bench/search_replay.py
+"""
+Search cassette for bench/run_graph.py, the search-side twin of llm_providers/replay.py.
+
+record: every SearchManager.search answer is appended (with latency) to a JSONL cassette.
+replay: answers are served from the cassette; a miss returns [] (the swarm turns it into a
+"SEARCH FAILED" artifact), so no engine, jitter sleep, Tavily or LLM simulation is reached.
+"""
+import asyncio
+import json
+import os
+import time
+from storage.cache import content_key
+
+def search_key(query: str, limit: int) -> str:
+    return content_key(query, limit)
+
+class SearchRecorder:
+    def __init__(self, search, cassette_path: str):
+        self._search = search
+        self.cassette_path = cassette_path
+        self._lock = asyncio.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(cassette_path)), exist_ok=True)
+        print(f"📼 Search Recording enabled -> {cassette_path}")
+
+    async def search(self, query: str, limit: int = 5, **kwargs):
+        start = time.perf_counter()
+        results = await self._search(query, limit=limit, **kwargs)
+        entry = {
+            "key": search_key(query, limit),
+            "query": query,
+            "limit": limit,
+            "latency": time.perf_counter() - start,
+            "results": results,
+        }
+        async with self._lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return results
+
+class SearchReplayer:
+    """Identical queries recorded several times are replayed round-robin, like ReplayProvider."""
+    def __init__(self, cassette_path: str, latency_scale: float = 0.0):
+        self.latency_scale = latency_scale
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._cursor = {}
+        if not os.path.exists(cassette_path):
+            print(f"⚠️ SearchReplayer: Cassette not found at {cassette_path}. Every search will miss.")
+            return
+        with open(cassette_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._entries.setdefault(entry["key"], []).append(entry)
+        print(f"📼 SearchReplayer: Loaded {sum(len(v) for v in self._entries.values())} recorded searches.")
+
+    def rewind(self):
+        self._cursor = {}
+
+    async def search(self, query: str, limit: int = 5, **kwargs):
+        key = search_key(query, limit)
+        recordings = self._entries.get(key)
+        if not recordings:
+            self.misses += 1
+            return []
+
+        self.hits += 1
+        idx = self._cursor.get(key, 0)
+        self._cursor[key] = idx + 1
+        entry = recordings[idx % len(recordings)]
+        if self.latency_scale > 0:
+            await asyncio.sleep(entry.get("latency", 0.0) * self.latency_scale)
+        return entry["results"]
+
+def install(search_manager, mode: str, cassette_path: str, latency_scale: float = 0.0):
+    """Routes search_manager.search through the cassette (live mode leaves it untouched)."""
+    if mode == "record":
+        wrapper = SearchRecorder(search_manager.search, cassette_path)
+    elif mode == "replay":
+        wrapper = SearchReplayer(cassette_path, latency_scale)
+    else:
+        return None
+    search_manager.search = wrapper.search
+    return wrapper
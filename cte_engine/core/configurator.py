@@ -45,7 +45,7 @@ class HyperparameterAgent:
         
         try:
             # We use a static config for the configurator itself to ensure valid JSON
-            resp = await llm.generate(prompt, config={"temperature": 0.2}, json_mode=True)
+            resp = await llm.generate(prompt, config={"temperature": 0.2}, json_mode=True, cache=True)
             cleaned = resp.replace("```json", "").replace("```", "").strip()
             data = json.loads(cleaned)
             
@@ -31,7 +31,7 @@ class ContradictionEstimator:
         
         try:
             # Low temp for logic extraction
-            resp = await llm.generate(prompt, config={"temperature": 0.2}, json_mode=True)
+            resp = await llm.generate(prompt, config={"temperature": 0.2}, json_mode=True, cache=True)
             cleaned = resp.replace("```json", "").replace("```", "").strip()
             data = json.loads(cleaned)
             return data.get("required_agents", [])
@@ -0,0 +1,94 @@
+# FILE: cte_engine/core/evidence_index.py
+from llm_providers.embeddings import embedder
+import numpy as np
+import uuid
+
+class EvidenceIndex:
+    """
+    Run-scoped, append-only matrix of normalized evidence embeddings.
+
+    research_evidence only ever grows across OODA iterations, so each artifact is
+    embedded once (keyed by the text that is embedded) and its row is reused by every
+    later divergence pass and by the synthesizer.
+    """
+    def __init__(self, dim: int = None, max_chars: int = 500):
+        self.dim = dim or embedder.vector_size
+        # Identifies this run's rows for anything memoized against them
+        self.token = uuid.uuid4().hex
+        self.max_chars = max_chars
+        self.artifacts = []
+        self._rows = {}
+        self._buffer = np.zeros((0, self.dim))
+
+    def __len__(self):
+        return len(self.artifacts)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._buffer[:len(self.artifacts)]
+
+    def _text(self, artifact: dict) -> str:
+        return artifact.get('content', '')[:self.max_chars]
+
+    def _append(self, vectors: np.ndarray):
+        n, needed = len(self.artifacts), len(self.artifacts) + len(vectors)
+        if needed > len(self._buffer):
+            # Capacity doubles so appends stay amortized O(new rows)
+            grown = np.zeros((max(needed, 2 * len(self._buffer), 16), self.dim))
+            grown[:n] = self._buffer[:n]
+            self._buffer = grown
+        self._buffer[n:needed] = vectors
+
+    async def add(self, evidence: list) -> int:
+        """Embeds only artifacts not seen before. Returns how many rows were appended."""
+        new = {}
+        for artifact in evidence:
+            text = self._text(artifact)
+            if text not in self._rows and text not in new:
+                new[text] = artifact
+        if not new:
+            return 0
+
+        vectors = np.asarray(await embedder.embed_batch(list(new.keys())), dtype=np.float64)
+        # Zero rows (embedding fallbacks) stay zero
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._append(vectors / norms)
+
+        for text, artifact in new.items():
+            self._rows[text] = len(self.artifacts)
+            self.artifacts.append(artifact)
+        return len(new)
+
+    def positions(self, evidence: list) -> list:
+        """Row of each artifact (all must have been added)."""
+        return [self._rows[self._text(a)] for a in evidence]
+
+    async def search(self, query: str, limit: int = 5, score_threshold: float = 0.40) -> list:
+        """Cosine ranking over the run's own evidence, shaped like VectorDBManager.search_relevant."""
+        if not self.artifacts:
+            return []
+        q = np.asarray(await embedder.embed_text(query), dtype=np.float64)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return []
+
+        scores = self.matrix @ (q / norm)
+        results = []
+        for row in np.argsort(-scores):
+            artifact = self.artifacts[row]
+            if scores[row] < score_threshold or len(results) >= limit:
+                break
+            # Failed searches are kept in state for the UI but never used as evidence
+            if artifact.get('source_type') == 'system_error':
+                continue
+            results.append({
+                "content": artifact.get('content', ''),
+                "metadata": {
+                    "url": artifact.get('source_url') or "internal_memory",
+                    "source_type": artifact.get('source_type'),
+                    "agent_type": artifact.get('contradiction_type'),
+                },
+                "score": float(scores[row])
+            })
+        return results
@@ -1,10 +1,9 @@
 import numpy as np
-import networkx as nx
+from statistics import NormalDist
 
-class MathEngine:
-    def __init__(self):
-        self.rng = np.random.default_rng()
+_STD_NORMAL = NormalDist()
 
+class MathEngine:
     def _entropy(self, pk):
         """Helper: Calculate entropy in bits."""
         pk = np.array(pk)
@@ -43,45 +42,104 @@ class MathEngine:
         
         return float(max(0.0, h_prior - avg_h_posterior))
 
-    def compute_cvar(self, risk_scores: list[float], alpha: float = 0.1) -> float:
+    def compute_posterior_entropy_sum(self, sim_matrix: np.ndarray) -> np.ndarray:
+        """
+        Per-row sum of posterior binary entropies. Sums are additive over evidence columns,
+        so information gain can be extended incrementally as evidence is appended.
+        """
+        sim_matrix = np.asarray(sim_matrix, dtype=np.float64)
+        # Same sigmoid map and binary entropy as the scalar version, applied element-wise
+        p = np.clip(1 / (1 + np.exp(-4 * sim_matrix)), 0.001, 0.999)
+        h = -(p * np.log2(p) + (1 - p) * np.log2(1 - p))
+        return h.sum(axis=1)
+
+    def compute_cvar(self, risk_scores: list[float], alpha: float = 0.1, method: str = "parametric") -> float:
+        """
+        Conditional Value at Risk of the worst alpha tail.
+        "parametric" is the exact closed form under a normal assumption (deterministic);
+        "empirical" averages the worst alpha fraction of the observed scores.
+        """
         if not risk_scores: 
             return 0.5 
             
-        scores = np.array(risk_scores)
+        scores = np.asarray(risk_scores, dtype=np.float64)
         if np.max(scores) > 1.0:
             scores = scores / 10.0
-            
+
+        if method == "empirical":
+            return self.compute_empirical_cvar(scores, alpha)
+
         mu = np.mean(scores)
         sigma = np.std(scores) if len(scores) > 1 else 0.1
-        
-        # Monte Carlo Simulation
-        try:
-            simulated_losses = self.rng.normal(mu, sigma, 2000)
-            threshold_index = int(2000 * (1 - alpha))
-            sorted_losses = np.sort(simulated_losses)
-            worst_cases = sorted_losses[threshold_index:]
-            cvar = np.mean(worst_cases)
-            return float(np.clip(cvar, 0.0, 1.0))
-        except Exception:
-            return float(mu)
+        return float(self.compute_cvar_batch(np.array([mu]), sigma, alpha)[0])
 
-    def compute_spectral_score(self, graph_nodes: list, graph_edges: list) -> dict:
+    def compute_cvar_batch(self, mu, sigma=0.1, alpha: float = 0.1) -> np.ndarray:
+        """
+        Closed-form normal CVaR for many plans at once:
+        CVaR = mu + sigma * pdf(z) / alpha, with z = inv_cdf(1 - alpha). Clipped to [0, 1].
+        """
+        mu = np.asarray(mu, dtype=np.float64)
+        sigma = np.asarray(sigma, dtype=np.float64)
+        z = _STD_NORMAL.inv_cdf(1.0 - alpha)
+        tail_factor = _STD_NORMAL.pdf(z) / alpha
+        return np.clip(mu + sigma * tail_factor, 0.0, 1.0)
+
+    def compute_empirical_cvar(self, losses, alpha: float = 0.1) -> float:
+        """Mean of the worst ceil(alpha * n) losses, via partial selection instead of a full sort."""
+        losses = np.asarray(losses, dtype=np.float64)
+        n = len(losses)
+        if n == 0:
+            return 0.5
+        k = max(1, int(np.ceil(alpha * n)))
+        worst_cases = np.partition(losses, n - k)[n - k:]
+        return float(np.clip(np.mean(worst_cases), 0.0, 1.0))
+
+    def compute_spectral_score(self, graph_nodes: list, adjacency, warm_start: dict = None,
+                               tol: float = 1e-8, max_iter: int = 500) -> dict:
+        """
+        Eigenvector centrality straight from the weighted adjacency matrix (dense ndarray or
+        scipy.sparse), normalized so the most central node scores 1.0.
+
+        Power iteration on (A + I): same eigenvectors as A, but the dominant eigenvalue is
+        strictly largest in magnitude, so it cannot oscillate on bipartite-like graphs.
+        warm_start maps node -> previous score; between OODA iterations the plan set barely
+        changes, so starting from the last eigenvector converges in a few steps.
+        """
         if not graph_nodes:
             return {}
-        
+
         # If no edges, return default small centrality
-        if not graph_edges:
+        if adjacency is None:
+            return {node: 0.1 for node in graph_nodes}
+        nnz = adjacency.nnz if hasattr(adjacency, "nnz") else np.count_nonzero(adjacency)
+        if nnz == 0:
             return {node: 0.1 for node in graph_nodes}
 
-        G = nx.Graph()
-        G.add_nodes_from(graph_nodes)
-        G.add_weighted_edges_from(graph_edges)
+        n = len(graph_nodes)
 
         try:
-            centrality = nx.eigenvector_centrality_numpy(G, weight='weight')
-            max_val = max(centrality.values()) if centrality else 1.0
+            x = np.ones(n)
+            if warm_start:
+                known = [warm_start[node] for node in graph_nodes if warm_start.get(node, 0) > 0]
+                fill = float(np.mean(known)) if known else 1.0
+                x = np.array([warm_start.get(node, fill) if warm_start.get(node, 0) > 0 else fill for node in graph_nodes])
+            x = x / np.linalg.norm(x)
+
+            for _ in range(max_iter):
+                y = adjacency @ x + x
+                norm = np.linalg.norm(y)
+                if norm == 0:
+                    break
+                y = y / norm
+                if np.abs(y - x).sum() < n * tol:
+                    x = y
+                    break
+                x = y
+
+            centrality = np.abs(np.asarray(x)).ravel()
+            max_val = centrality.max() if centrality.size else 1.0
             if max_val == 0: max_val = 1.0
-            return {k: float(v / max_val) for k, v in centrality.items()}
+            return {node: float(v / max_val) for node, v in zip(graph_nodes, centrality)}
         except Exception:
             return {node: 0.1 for node in graph_nodes}
 
@@ -1,9 +1,28 @@
 from llm_providers.gemini import llm
+from storage.cache import content_key
+from util.config_loader import settings
+from util.metrics import CRITIC_CALLS_SKIPPED
+from collections import OrderedDict
+import copy
 import json
 import asyncio
 import re
 
 class MetaCritic:
+    def __init__(self, max_entries: int = None):
+        # Reviews of unchanged plans (same task, id, perspective and content) are reused
+        self.max_entries = max_entries or settings.CRITIC_MEMO_SIZE
+        self._reviews = OrderedDict()
+
+    def _review_key(self, task: str, plan: dict) -> str:
+        return content_key(task, plan['id'], plan.get('perspective', 'General'), plan['content'])
+
+    def _remember(self, key: str, review: dict):
+        self._reviews[key] = review
+        self._reviews.move_to_end(key)
+        while len(self._reviews) > self.max_entries:
+            self._reviews.popitem(last=False)
+
     async def evaluate_plans(self, task: str, plans: list):
         async def review_single(plan):
             prompt = f"""
@@ -73,7 +92,24 @@ class MetaCritic:
                     "rationale": "Evaluation Failed." 
                 }
 
-        reviews = await asyncio.gather(*[review_single(p) for p in plans])
+        async def memoized_review(plan):
+            key = self._review_key(task, plan)
+            cached = self._reviews.get(key)
+            if cached is not None:
+                self._reviews.move_to_end(key)
+                return copy.deepcopy(cached)
+            review = await review_single(plan)
+            # Crashed evaluations are never memoized, so the plan is retried next pass
+            if review.get("rationale") != "Evaluation Failed.":
+                self._remember(key, copy.deepcopy(review))
+            return review
+
+        skipped = sum(1 for p in plans if self._review_key(task, p) in self._reviews)
+        if skipped:
+            CRITIC_CALLS_SKIPPED.inc(skipped)
+            print(f"🧐 Meta-Critic: Reusing {skipped}/{len(plans)} reviews of unchanged plans.")
+
+        reviews = await asyncio.gather(*[memoized_review(p) for p in plans])
         return reviews
 
 critic = MetaCritic()
\ No newline at end of file
@@ -1,23 +1,192 @@
 import asyncio
 from search.manager import search_manager
 from storage.vectordb import vector_db
+from storage.cache import content_key
+from util.config_loader import settings
+from util.metrics import SWARM_STRAGGLERS
+from util.cancellation import spawn
+from collections import OrderedDict
+import numpy as np
 import datetime
+import hashlib
 import re
+import uuid
 
 class ResearchSwarm:
     def __init__(self):
-        # Limit concurrent searches to 2 to prevent Thundering Herd
-        self._semaphore = asyncio.Semaphore(2)
+        # Limit concurrent searches to prevent Thundering Herd
+        self._semaphore = asyncio.Semaphore(settings.SWARM_CONCURRENCY)
+        self.budget = settings.SWARM_BUDGET_SECONDS
+        self.stragglers = settings.SWARM_STRAGGLERS
+        self.simhash_distance = settings.EVIDENCE_SIMHASH_DISTANCE
+        # Artifact id -> SimHash. Ids are content hashes, so a fingerprint is computed once,
+        # not again on every pass for all evidence gathered so far
+        self._fingerprints = OrderedDict()
+        self.max_fingerprints = 4096
 
-    async def launch_swarm(self, agent_configs: list):
-        tasks = []
-        for config in agent_configs:
-            tasks.append(self._run_single_agent(config))
-        
-        results = await asyncio.gather(*tasks)
-        
-        flat_results = [item for sublist in results for item in sublist]
-        return flat_results
+    async def stream_swarm(self, agent_configs: list, existing: list = None, carried: list = None, pending_out: list = None):
+        """
+        Runs one search agent per contradiction, highest priority first, for at most
+        SWARM_BUDGET_SECONDS, and yields each agent's new artifacts as soon as its search
+        returns (filter -> dedup -> store happen per agent, while the others are still searching).
+        `carried` are agent tasks left running by the previous iteration; stragglers still
+        running at the deadline are appended to `pending_out`.
+        """
+        loop = asyncio.get_running_loop()
+        # Tasks are created in priority order and the semaphore admits waiters FIFO
+        ordered = sorted(agent_configs, key=self._priority, reverse=True)
+        started = set()
+        # Spawned in the run's scope, so stragglers left in the background die with an abandoned run
+        tasks = [spawn(self._run_single_agent(c, started)) for c in ordered]
+        carried = [t for t in carried or [] if not t.cancelled()]
+        # Carried tasks were in flight when they were kept, so they keep their background grace
+        started.update(carried)
+        tasks += carried
+
+        deadline = loop.time() + self.budget if self.budget > 0 else None
+        remaining = set(tasks)
+        seen_ids, seen = self._seen(existing or [])
+        stores, dropped = [], 0
+        timed_out = False
+        try:
+            while remaining:
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                done, remaining = await asyncio.wait(remaining, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    timed_out = True
+                    break
+
+                for task in [t for t in tasks if t in done]:
+                    if task.cancelled() or task.exception() is not None:
+                        print(f"❌ Agent task failed: {'cancelled' if task.cancelled() else task.exception()}")
+                        continue
+                    artifacts = task.result()
+                    unique = self._deduplicate(artifacts, seen_ids, seen)
+                    dropped += len(artifacts) - len(unique)
+                    if not unique:
+                        continue
+                    # Storage runs in the background while the next search is awaited
+                    stores.append(spawn(self._store(unique)))
+                    yield unique
+        finally:
+            if timed_out:
+                kept = self._handle_stragglers(remaining, started)
+                if pending_out is not None:
+                    pending_out.extend(kept)
+            else:
+                # Consumer closed the stream or the run was cancelled: nobody will collect these
+                for task in remaining:
+                    task.cancel()
+            if dropped:
+                print(f"🧹 Swarm: Dropped {dropped} duplicate artifacts.")
+            if stores:
+                await asyncio.gather(*stores, return_exceptions=True)
+
+    async def _store(self, artifacts: list):
+        # Point ids derive from the content hash, so re-storing the same evidence is an idempotent upsert
+        stored = [a for a in artifacts if a["source_type"] != "system_error"]
+        await vector_db.store_artifacts(
+            [self._storage_record(a) for a in stored],
+            ids=[str(uuid.UUID(hex=a["id"])) for a in stored]
+        )
+
+    @staticmethod
+    def _priority(config: dict) -> float:
+        try:
+            return float(config.get("priority", 0.5))
+        except (TypeError, ValueError):
+            return 0.5
+
+    def _handle_stragglers(self, pending: set, started: set) -> list:
+        """
+        Agents past the budget: in-flight searches keep running in the background (when
+        enabled) and are collected next iteration; agents that never got a slot are dropped,
+        since the next contradiction pass re-plans them anyway.
+        """
+        kept = []
+        for task in pending:
+            if self.stragglers == "background" and task in started:
+                kept.append(task)
+            else:
+                task.cancel()
+        if pending:
+            SWARM_STRAGGLERS.labels(action="background").inc(len(kept))
+            SWARM_STRAGGLERS.labels(action="cancelled").inc(len(pending) - len(kept))
+            print(f"⏱️ Swarm budget ({self.budget:.1f}s) spent: {len(kept)} agents left running, {len(pending) - len(kept)} cancelled.")
+        return kept
+
+    def cancel_pending(self, tasks: list):
+        """Drops stragglers nobody will collect (e.g. the run is moving on to synthesis)."""
+        for task in tasks or []:
+            if not task.done():
+                task.cancel()
+                SWARM_STRAGGLERS.labels(action="cancelled").inc()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(re.findall(r"\w+", text.lower()))
+
+    def _artifact_id(self, content: str) -> str:
+        # 128-bit content hash: stable across engines, agents and iterations, and a valid UUID
+        return content_key(self._normalize(content))[:32]
+
+    def _fingerprint(self, text: str) -> int:
+        """64-bit SimHash over word 3-shingles; near-duplicate texts differ in only a few bits."""
+        tokens = self._normalize(text).split()
+        shingles = [" ".join(tokens[i:i + 3]) for i in range(max(1, len(tokens) - 2))]
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+            dtype=np.uint64
+        )
+        bits = np.unpackbits(hashes.view(np.uint8), bitorder="little").reshape(-1, 64)
+        votes = (2 * bits.astype(np.int32) - 1).sum(axis=0)
+        return int(np.packbits(votes > 0, bitorder="little").view(np.uint64)[0])
+
+    def _fingerprint_of(self, artifact: dict) -> int:
+        key = artifact.get("id")
+        fingerprint = self._fingerprints.get(key)
+        if fingerprint is None:
+            fingerprint = self._fingerprint(artifact.get("content", ""))
+            self._fingerprints[key] = fingerprint
+            while len(self._fingerprints) > self.max_fingerprints:
+                self._fingerprints.popitem(last=False)
+        else:
+            self._fingerprints.move_to_end(key)
+        return fingerprint
+
+    def _seen(self, existing: list):
+        return {a.get("id") for a in existing}, [self._fingerprint_of(a) for a in existing]
+
+    def _deduplicate(self, artifacts: list, seen_ids: set, seen: list) -> list:
+        """
+        Drops exact duplicates (same content-hash id) and near duplicates (SimHash within
+        EVIDENCE_SIMHASH_DISTANCE bits) against everything seen so far; kept artifacts are
+        added to seen_ids / seen.
+        """
+        unique = []
+        for artifact in artifacts:
+            if artifact["id"] in seen_ids:
+                continue
+            fingerprint = self._fingerprint_of(artifact)
+            if seen:
+                # Hamming distance to every kept fingerprint at once
+                xor = np.bitwise_xor(np.array(seen, dtype=np.uint64), np.uint64(fingerprint))
+                distances = np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+                if distances.min() <= self.simhash_distance:
+                    continue
+            seen_ids.add(artifact["id"])
+            seen.append(fingerprint)
+            unique.append(artifact)
+        return unique
+
+    def _storage_record(self, artifact: dict):
+        metadata = {
+            "url": artifact["source_url"],
+            "source_type": artifact["source_type"],
+            "agent_type": artifact["contradiction_type"],
+            "contradiction_query": artifact["query"]
+        }
+        return artifact["content"], metadata
 
     def _is_garbage_content(self, title: str, content: str) -> bool:
         """
@@ -39,7 +208,7 @@ class ResearchSwarm:
             
         return False
 
-    async def _run_single_agent(self, config):
+    async def _run_single_agent(self, config, started: set = None):
         query = config.get("focus_query", "")
         agent_type = config.get("type", "General")
         
@@ -49,6 +218,8 @@ class ResearchSwarm:
 
         # Acquire lock before searching
         async with self._semaphore:
+            if started is not None:
+                started.add(asyncio.current_task())
             try:
                 # Increased limit to allow for filtering
                 raw_results = await search_manager.search(query, limit=5)
@@ -59,10 +230,11 @@ class ResearchSwarm:
         artifacts = []
         
         if not raw_results:
+             content = f"SEARCH FAILED: Could not retrieve data for '{query}'."
              return [{
-                "id": str(datetime.datetime.now().timestamp()),
+                "id": self._artifact_id(content),
                 "query": query,
-                "content": f"SEARCH FAILED: Could not retrieve data for '{query}'.",
+                "content": content,
                 "source_url": "internal://error",
                 "source_type": "system_error",
                 "contradiction_type": agent_type,
@@ -79,19 +251,10 @@ class ResearchSwarm:
                 
             full_content = f"{title} - {content_snippet}"
             
-            metadata = {
-                "url": res['url'],
-                "source_type": res['source'],
-                "agent_type": agent_type,
-                "contradiction_query": query
-            }
-            
-            # Store in Vector DB for Semantic Retrieval later
-            await vector_db.store_artifact(full_content, metadata)
-            
-            # Add to state (for logging/UI mostly, Synthesizer will use Vector DB)
+            # Add to state (for logging/UI mostly, Synthesizer will use Vector DB).
+            # Vector DB storage happens per agent in stream_swarm, after dedup.
             artifacts.append({
-                "id": str(datetime.datetime.now().timestamp()),
+                "id": self._artifact_id(full_content),
                 "query": query,
                 "content": full_content,
                 "source_url": res['url'],
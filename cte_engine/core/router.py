@@ -2,6 +2,25 @@
 import random
 
 class DecisionRouter:
+    GROUPTHINK_BELOW = 0.40
+    CONFUSION_ABOVE = 0.85
+
+    def expects_synthesis(self, state: dict, certain_only: bool = True) -> bool:
+        """
+        Side-effect-free guess whether decide() will return "synthesize" once this pass
+        finishes, using the divergence currently in state (i.e. the previous pass's).
+        certain_only restricts the guess to the hard stop, which never misses.
+        """
+        iteration = state.get("iteration_count", 0)
+        if iteration >= state.get("max_iterations", 2):
+            return True
+        if certain_only or iteration == 0 or not state.get("research_evidence"):
+            return False
+        divergence = state.get("divergence_score", 0.0)
+        if state.get("hitl_enabled", False) and 0.45 <= divergence <= 0.75 and not state.get("human_feedback", ""):
+            return False
+        return self.GROUPTHINK_BELOW <= divergence <= self.CONFUSION_ABOVE
+
     async def decide(self, state: dict) -> str:
         """
         Deterministic OODA Loop Logic with HITL Awareness.
@@ -43,12 +62,12 @@ class DecisionRouter:
                 return "refine"
 
         # Groupthink Check
-        if divergence < 0.40:
+        if divergence < self.GROUPTHINK_BELOW:
             print(f"Router: Divergence {divergence:.2f} too low (Groupthink). Injecting Chaos.")
             return "chaos_injection"
 
         # Confusion Check
-        if divergence > 0.85:
+        if divergence > self.CONFUSION_ABOVE:
             print(f"Router: Divergence {divergence:.2f} too high (Confusion). Refining.")
             return "refine"
             
@@ -1,7 +1,11 @@
 from core.math_engine import math_engine
+from core.evidence_index import EvidenceIndex
 from llm_providers.embeddings import embedder
+from storage.cache import content_key
+from util.config_loader import settings
+from util.metrics import CACHE_REQUESTS
+from collections import OrderedDict
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import asyncio
 
 class AdvancedScoring:
@@ -10,90 +14,172 @@ class AdvancedScoring:
         self.gamma = 1.0  
         self.lam = 0.5    
         self.mu = 1.0     
-        
-    async def batch_score(self, plans: list, reviews: list, evidence: list):
+        self.edge_threshold = 0.05
+        # Per-plan components that do not depend on the other plans, keyed by content hash:
+        # the normalized embedding and the running entropy sum against the run's evidence
+        self.memo_size = settings.SCORE_MEMO_SIZE
+        self._plan_memo = OrderedDict()
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        # Zero rows (embedding fallbacks) stay zero, matching sklearn's cosine_similarity
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _plan_entries(self, plan_texts: list) -> list:
+        entries = []
+        for text in plan_texts:
+            key = content_key(text)
+            entry = self._plan_memo.get(key)
+            if entry is None:
+                entry = self._plan_memo[key] = {}
+            self._plan_memo.move_to_end(key)
+            entries.append(entry)
+        while len(self._plan_memo) > self.memo_size:
+            self._plan_memo.popitem(last=False)
+        return entries
+
+    async def _plan_matrix(self, plan_texts: list, entries: list) -> np.ndarray:
+        """Normalized plan embeddings; only new or edited plans are embedded."""
+        missing = [i for i, e in enumerate(entries) if "vector" not in e]
+        hits = len(entries) - len(missing)
+        if hits:
+            CACHE_REQUESTS.labels(cache="plan_score", tier="memory", result="hit").inc(hits)
+        if missing:
+            CACHE_REQUESTS.labels(cache="plan_score", tier="all", result="miss").inc(len(missing))
+            fresh = self._normalize_rows(np.asarray(
+                await embedder.embed_batch([plan_texts[i] for i in missing]), dtype=np.float64
+            ))
+            for i, vector in zip(missing, fresh):
+                entries[i]["fresh"] = vector
+                # Zero rows are embedding fallbacks; they are not memoized so the plan is retried
+                if np.any(vector):
+                    entries[i]["vector"] = vector
+        P = np.vstack([e.get("vector", e.get("fresh")) for e in entries])
+        for e in entries:
+            e.pop("fresh", None)
+        return P
+
+    def _information_gain(self, P: np.ndarray, entries: list, index: EvidenceIndex, positions: list) -> np.ndarray:
+        """
+        I_p from memoized entropy sums: research_evidence only grows within a run, so a plan
+        scored before only needs the evidence appended since its last pass.
+        """
+        m = len(positions)
+        E = index.matrix[positions]
+        h_sum = np.zeros(len(entries))
+        start = np.zeros(len(entries), dtype=int)
+        signatures = {}
+        for i, entry in enumerate(entries):
+            token, seen, signature, partial = entry.get("info", (None, 0, None, 0.0))
+            if token == index.token and seen <= m:
+                if seen not in signatures:
+                    signatures[seen] = hash(tuple(positions[:seen]))
+                if signatures[seen] == signature:
+                    start[i], h_sum[i] = seen, partial
+
+        # One matmul per distinct starting offset (usually: 0 for new plans, previous m for the rest)
+        for offset in np.unique(start):
+            rows = np.nonzero(start == offset)[0]
+            if offset < m:
+                h_sum[rows] += math_engine.compute_posterior_entropy_sum(P[rows] @ E[offset:].T)
+
+        signature = hash(tuple(positions))
+        for i, entry in enumerate(entries):
+            if "vector" in entry:
+                entry["info"] = (index.token, m, signature, float(h_sum[i]))
+        return np.maximum(0.0, 1.0 - h_sum / m)
+
+    def _group_reviews(self, plan_ids: list, reviews: list):
+        """Mean logic and risk per plan from a single pass over the reviews (NaN = not reviewed)."""
+        index = {pid: i for i, pid in enumerate(plan_ids)}
+        sums = np.zeros((len(plan_ids), 2))
+        counts = np.zeros(len(plan_ids))
+        for r in reviews:
+            i = index.get(r.get('plan_id'))
+            if i is None:
+                continue
+            scores = r.get('scores', {})
+            sums[i, 0] += scores.get('logic', 0)
+            sums[i, 1] += scores.get('risk', 0)
+            counts[i] += 1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts[:, None]
+        return means[:, 0], means[:, 1]
+
+    async def batch_score(self, plans: list, reviews: list, evidence: list, warm_start: dict = None,
+                          evidence_index: EvidenceIndex = None):
         """
         Scores all plans. Guarantees a result for every plan ID.
+        Works on one normalized plan matrix and one evidence matrix: a single matmul
+        for all pairwise distances and one for all plan/evidence similarities.
+        warm_start is the previous iteration's centrality vector (plan id -> S_spec);
+        evidence_index is the run's EvidenceIndex, so only new evidence gets embedded.
         """
         results = {}
         if not plans: return results
 
+        n = len(plans)
+        plan_ids = [p['id'] for p in plans]
+
         try:
+            # Defaults
+            I_p = np.zeros(n)
+            S_spec = np.zeros(n)
+            C_p = np.zeros(n)
+
             # 1. Embeddings & Graph (Safe Mode)
             try:
                 plan_texts = [p.get('content', '')[:1000] for p in plans]
-                plan_embeddings = await embedder.embed_batch(plan_texts)
-                
-                evidence_embeddings = []
+                entries = self._plan_entries(plan_texts)
+                P = await self._plan_matrix(plan_texts, entries)
+
+                # Pairwise cosine distance; edges only above the threshold, no self-loops
+                dist = 1.0 - P @ P.T
+                adjacency = np.where(dist > self.edge_threshold, dist, 0.0)
+                np.fill_diagonal(adjacency, 0.0)
+
+                edge_counts = (adjacency > 0).sum(axis=1)
+                C_p = np.divide(adjacency.sum(axis=1), edge_counts, out=np.zeros(n), where=edge_counts > 0)
+
+                spectral_scores = math_engine.compute_spectral_score(plan_ids, adjacency, warm_start=warm_start)
+                S_spec = np.array([spectral_scores.get(pid, 0.0) for pid in plan_ids])
+
                 if evidence:
-                    ev_texts = [e.get('content', '')[:500] for e in evidence]
-                    evidence_embeddings = await embedder.embed_batch(ev_texts)
-                
-                # Build Graph
-                nodes = [p['id'] for p in plans]
-                edges = []
-                for i in range(len(plans)):
-                    for j in range(i + 1, len(plans)):
-                        sim = cosine_similarity([plan_embeddings[i]], [plan_embeddings[j]])[0][0]
-                        dist = 1.0 - sim
-                        if dist > 0.05: 
-                            edges.append((plans[i]['id'], plans[j]['id'], float(dist)))
-                
-                spectral_scores = math_engine.compute_spectral_score(nodes, edges)
+                    index = evidence_index if evidence_index is not None else EvidenceIndex()
+                    await index.add(evidence)
+                    I_p = self._information_gain(P, entries, index, index.positions(evidence))
             except Exception as e:
                 print(f"⚠️ Scoring Vector/Graph Error: {e}")
-                plan_embeddings = None
-                evidence_embeddings = None
-                spectral_scores = {}
-                edges = []
-
-            # 2. Score Each Plan
-            for idx, plan in enumerate(plans):
-                p_id = plan['id']
-                
-                # Defaults
-                E_U, I_p, R_risk, S_spec, C_p = 0.5, 0.0, 0.5, 0.0, 0.0
-
-                try:
-                    # A. Utility
-                    plan_reviews = [r for r in reviews if r['plan_id'] == p_id]
-                    if plan_reviews:
-                        raw_logic = np.mean([r['scores'].get('logic', 0) for r in plan_reviews])
-                        raw_risk = np.mean([r['scores'].get('risk', 0) for r in plan_reviews])
-                        E_U = raw_logic / 10.0
-                        R_risk = math_engine.compute_cvar([raw_risk], alpha=0.1)
-                    
-                    # B. Info Gain
-                    if evidence_embeddings and plan_embeddings:
-                        sim_matrix = cosine_similarity([plan_embeddings[idx]], evidence_embeddings)[0]
-                        I_p = math_engine.compute_information_gain(sim_matrix.tolist())
-
-                    # C. Spectral & Conflict
-                    S_spec = spectral_scores.get(p_id, 0.0)
-                    my_edges = [w for u, v, w in edges if u == p_id or v == p_id]
-                    C_p = np.mean(my_edges) if my_edges else 0.0
-
-                except Exception as inner_e:
-                    print(f"⚠️ Scoring Calculation Error for {p_id}: {inner_e}")
-
-                # Final Calc
-                final_score = E_U + (self.alpha * I_p) - (self.gamma * R_risk) - (self.lam * C_p) + (self.mu * S_spec)
-                
+
+            # 2. Utility & Risk (reviews grouped by plan_id in one pass)
+            raw_logic, raw_risk = self._group_reviews(plan_ids, reviews)
+            reviewed = ~np.isnan(raw_logic)
+            E_U = np.where(reviewed, raw_logic / 10.0, 0.5)
+            # Reviews are 0-10, one risk value per plan (sigma stays at the 0.1 default)
+            risk_mu = np.where(raw_risk > 1.0, raw_risk / 10.0, raw_risk)
+            R_risk = np.where(reviewed, math_engine.compute_cvar_batch(np.nan_to_num(risk_mu), 0.1, alpha=0.1), 0.5)
+
+            # 3. Final Calc (all plans at once)
+            totals = E_U + (self.alpha * I_p) - (self.gamma * R_risk) - (self.lam * C_p) + (self.mu * S_spec)
+
+            for i, p_id in enumerate(plan_ids):
                 results[p_id] = {
-                    "total": float(final_score),
+                    "total": float(totals[i]),
                     "components": {
-                        "Utility": float(E_U),
-                        "InfoGain": float(self.alpha * I_p),
-                        "RiskPenalty": float(-(self.gamma * R_risk)),
-                        "Conflict": float(-(self.lam * C_p)),
-                        "Spectral": float(self.mu * S_spec)
+                        "Utility": float(E_U[i]),
+                        "InfoGain": float(self.alpha * I_p[i]),
+                        "RiskPenalty": float(-(self.gamma * R_risk[i])),
+                        "Conflict": float(-(self.lam * C_p[i])),
+                        "Spectral": float(self.mu * S_spec[i])
                     },
                     "metrics": {
-                        "E_U": float(E_U),
-                        "I_p": float(I_p),
-                        "CVaR": float(R_risk),
-                        "S_spec": float(S_spec),
-                        "Conflict": float(C_p)
+                        "E_U": float(E_U[i]),
+                        "I_p": float(I_p[i]),
+                        "CVaR": float(R_risk[i]),
+                        "S_spec": float(S_spec[i]),
+                        "Conflict": float(C_p[i])
                     }
                 }
 
@@ -105,4 +191,4 @@ class AdvancedScoring:
 
         return results
 
-advanced_scorer = AdvancedScoring()
\ No newline at end of file
+advanced_scorer = AdvancedScoring()
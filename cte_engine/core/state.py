@@ -24,6 +24,17 @@ class ResearchArtifact(TypedDict):
     contradiction_type: str
     timestamp: str
 
+def merge_by_id(existing: list, update: list) -> list:
+    """Reducer: appends items whose id is not present yet, so parallel or repeated writes never duplicate."""
+    existing = existing or []
+    seen = {item.get("id") for item in existing}
+    merged = list(existing)
+    for item in update or []:
+        if item.get("id") not in seen:
+            seen.add(item.get("id"))
+            merged.append(item)
+    return merged
+
 class LLMConfig(TypedDict):
     temperature: float
     top_p: float
@@ -54,6 +65,7 @@ class CTEState(TypedDict):
     
     # Dynamic Reporting
     report_template: str
+    speculative_template: Optional[Dict[str, Any]]  # {"key", "task"}: template design started ahead of the router
     
     # Recursion Control
     iteration_count: int
@@ -67,16 +79,37 @@ class CTEState(TypedDict):
     
     # Analysis Data
     contradiction_types: List[Dict[str, Any]] 
-    research_evidence: List[ResearchArtifact]
+    research_evidence: Annotated[List[ResearchArtifact], merge_by_id]
+    evidence_index: Optional[Any]  # Run-scoped EvidenceIndex (embeddings of research_evidence)
+    pending_research: List[Any]  # Swarm agent tasks still running past the last budget
     reviews: List[Review]
     
     # Math Engine Outputs
     divergence_score: float
     provenance: Dict[str, Any]
+    centrality_vector: Dict[str, float]  # Warm start for the next spectral pass
     
     # Output
     synthesis: str
     run_id: Optional[str]
     
     # Logs
-    logs: Annotated[List[str], operator.add]
\ No newline at end of file
+    logs: Annotated[List[str], operator.add]
+
+class ResearchBranchInput(TypedDict):
+    # What the contradiction -> swarm subgraph reads from the parent. No logs: the branch
+    # starts with an empty log channel, so it streams and returns only its own lines
+    task: str
+    plans: List[Plan]
+    contradiction_types: List[Dict[str, Any]]
+    research_evidence: Annotated[List[ResearchArtifact], merge_by_id]
+    evidence_index: Optional[Any]
+    pending_research: List[Any]
+
+class ResearchBranchOutput(TypedDict):
+    # What the subgraph hands back to the parent graph; its log lines are appended once
+    contradiction_types: List[Dict[str, Any]]
+    research_evidence: Annotated[List[ResearchArtifact], merge_by_id]
+    evidence_index: Optional[Any]
+    pending_research: List[Any]
+    logs: Annotated[List[str], operator.add]
@@ -4,7 +4,12 @@ import json
 import asyncio
 
 class Synthesizer:
-    async def synthesize(self, task: str, plans: list, reviews: list, divergence: float, template: str, evidence: list = None):
+    async def synthesize(self, task: str, plans: list, reviews: list, divergence: float, template: str,
+                         evidence: list = None, evidence_index=None, on_chunk=None):
+        """
+        Builds the final strategic brief. When on_chunk is given, the brief is streamed and
+        every chunk is passed to it as it arrives; the assembled text is still returned.
+        """
         # 1. Prepare Plan Context
         plans_text = ""
         for p in plans:
@@ -23,8 +28,13 @@ class Synthesizer:
 
         print(f"⚗️ Synthesizer: Performing Semantic Search for context filtering...")
         
-        # Retrieve top 15 most semantically relevant chunks to exclude dictionary definitions/noise
-        relevant_artifacts = await vector_db.search_relevant(search_query, limit=15)
+        # Retrieve top 15 most semantically relevant chunks to exclude dictionary definitions/noise.
+        # The run's evidence is already embedded in its index; Qdrant is only the fallback.
+        relevant_artifacts = []
+        if evidence_index is not None:
+            relevant_artifacts = await evidence_index.search(search_query, limit=15)
+        if not relevant_artifacts:
+            relevant_artifacts = await vector_db.search_relevant(search_query, limit=15)
         
         evidence_text = ""
         if relevant_artifacts:
@@ -81,8 +91,15 @@ class Synthesizer:
         try:
             # High output tokens to prevent truncation
             print("⚗️ Synthesizer: Generating final report...")
-            response = await llm.generate(prompt, config={"temperature": 0.3, "max_output_tokens": 8192})
-            return response
+            config = {"temperature": 0.3, "max_output_tokens": 8192}
+            if on_chunk is None:
+                return await llm.generate(prompt, config=config)
+
+            chunks = []
+            async for chunk in llm.generate_stream(prompt, config=config):
+                chunks.append(chunk)
+                on_chunk(chunk)
+            return "".join(chunks)
         except Exception as e:
             return f"# ⚠️ Synthesis Failed\n\nError: {str(e)}"
 
@@ -35,7 +35,7 @@ class TemplateArchitect:
         
         try:
             # We want a creative structure, so slightly higher temp
-            template = await llm.generate(prompt, config={"temperature": 0.5})
+            template = await llm.generate(prompt, config={"temperature": 0.5}, cache=True)
             return template
         except Exception as e:
             print(f"⚠️ Architect Error: {e}")
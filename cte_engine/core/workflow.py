@@ -1,6 +1,7 @@
 # FILE: cte_engine/core/workflow.py
 from langgraph.graph import StateGraph, END
-from core.state import CTEState
+from langgraph.types import StreamWriter
+from core.state import CTEState, ResearchBranchInput, ResearchBranchOutput
 from core.planner import planner
 from core.meta_critic import critic
 from core.scoring import advanced_scorer
@@ -8,10 +9,15 @@ from core.provenance import provenance_engine
 from core.synthesizer import synthesizer
 from core.contradiction import contradiction_analyzer
 from core.researcher import research_swarm
+from core.evidence_index import EvidenceIndex
 from core.router import decision_router
 from core.configurator import config_agent
 from core.template_architect import template_architect
 from storage.mongo import mongo_db
+from storage.cache import content_key
+from util.config_loader import settings
+from util.metrics import timed_node, SPECULATIVE_TEMPLATES
+from util.cancellation import spawn
 import asyncio
 import numpy as np
 import traceback
@@ -34,6 +40,34 @@ def generate_runbook(task, plans, reviews, divergence, synthesis, status, proven
         "details": {"plans": plans, "reviews": reviews}
     }
 
+def _template_key(state: CTEState, plans: list) -> str:
+    # Only what the architect is given; score_data added by divergence does not invalidate it
+    return content_key(state["task"], state.get("detected_nature", "General"), [(p["id"], p["content"]) for p in plans])
+
+def _speculate_template(state: CTEState, update: dict) -> dict:
+    """
+    Starts template design in the background when the pass about to run will probably end
+    in synthesis (SPECULATIVE_TEMPLATE), so the LLM call overlaps research, critic and
+    divergence instead of following the router.
+    """
+    mode = settings.SPECULATIVE_TEMPLATE
+    if mode not in ("last_iteration", "likely"):
+        return update
+    upcoming = {**state, **update}
+    if not decision_router.expects_synthesis(upcoming, certain_only=mode == "last_iteration"):
+        return update
+    task = spawn(template_architect.design_template(
+        upcoming["task"],
+        upcoming.get("detected_nature", "General"),
+        upcoming["plans"]
+    ))
+    print(f"📐 Architect: Speculatively designing the report template ({mode}).")
+    return {**update, "speculative_template": {"key": _template_key(upcoming, upcoming["plans"]), "task": task}}
+
+def _discard_speculation(speculation: dict):
+    speculation["task"].cancel()
+    SPECULATIVE_TEMPLATES.labels(outcome="wasted").inc()
+
 async def node_configurator(state: CTEState):
     # 1. Run the Auto-Configurator first to get nature detection
     result = await config_agent.configure(state["task"])
@@ -80,7 +114,7 @@ async def node_planner(state: CTEState):
             config=state.get("llm_config"), 
             count=3
         )
-        return {"plans": plans, "logs": [f"🧠 [Planner] Generated {len(plans)} initial paths."]}
+        return _speculate_template(state, {"plans": plans, "logs": [f"🧠 [Planner] Generated {len(plans)} initial paths."]})
     return {}
 
 async def node_contradiction(state: CTEState):
@@ -88,11 +122,28 @@ async def node_contradiction(state: CTEState):
     types = [c['type'] for c in configs]
     return {"contradiction_types": configs, "logs": [f"🔍 [Analyzer] Conflicts: {', '.join(types)}"]}
 
-async def node_research_swarm(state: CTEState):
+async def node_research_swarm(state: CTEState, writer: StreamWriter):
     configs = state.get("contradiction_types", [])
-    evidence = await research_swarm.launch_swarm(configs)
     existing = state.get("research_evidence", [])
-    return {"research_evidence": existing + evidence, "logs": [f"🛰️ [Swarm] Gathered {len(evidence)} artifacts."]}
+    # Embed each artifact once per run; scoring and synthesis reuse the rows
+    index = state.get("evidence_index")
+    if index is None:
+        index = EvidenceIndex()
+
+    # Only evidence not already seen this run (exact or near duplicate) comes back, one agent at a time:
+    # it is pushed to the UI and embedded while the remaining searches are still in flight.
+    # Agents still searching when the budget ran out are carried to the next iteration.
+    evidence, pending = [], []
+    async for chunk in research_swarm.stream_swarm(configs, existing, state.get("pending_research"), pending):
+        evidence.extend(chunk)
+        writer({"type": "evidence_chunk", "data": chunk})
+        await index.add(chunk)
+    return {
+        "research_evidence": existing + evidence,
+        "evidence_index": index,
+        "pending_research": pending,
+        "logs": [f"🛰️ [Swarm] Gathered {len(evidence)} artifacts." + (f" {len(pending)} agents still searching." if pending else "")]
+    }
 
 async def node_critic(state: CTEState):
     reviews = await critic.evaluate_plans(state["task"], state["plans"])
@@ -104,7 +155,11 @@ async def node_divergence(state: CTEState):
         reviews = state["reviews"]
         evidence = state.get("research_evidence", [])
         
-        scores_map = await advanced_scorer.batch_score(plans, reviews, evidence)
+        scores_map = await advanced_scorer.batch_score(
+            plans, reviews, evidence,
+            warm_start=state.get("centrality_vector"),
+            evidence_index=state.get("evidence_index")
+        )
         scored_plans = []
         totals = []
         for p in plans:
@@ -114,10 +169,13 @@ async def node_divergence(state: CTEState):
             
         prov_data = provenance_engine.generate_provenance(scored_plans)
         divergence = float(np.std(totals)) if totals else 0.0
+        # Carried to the next iteration to warm-start the centrality solver
+        centrality = {p['id']: p['score_data'].get('metrics', {}).get('S_spec', 0.0) for p in scored_plans}
         
         return {
             "plans": scored_plans, 
             "divergence_score": divergence, 
+            "centrality_vector": centrality,
             "provenance": prov_data, 
             "logs": [f"⚡ [Math Engine] Divergence: {divergence:.4f}"]
         }
@@ -127,7 +185,16 @@ async def node_divergence(state: CTEState):
 
 async def node_router(state: CTEState):
     decision = await decision_router.decide(state)
-    return {"router_decision": decision, "logs": [f"🚦 [OODA Router] Decision: {decision.upper()}"]}
+    update = {"router_decision": decision, "logs": [f"🚦 [OODA Router] Decision: {decision.upper()}"]}
+    if decision == "synthesize" and state.get("pending_research"):
+        # No further swarm pass will collect them
+        research_swarm.cancel_pending(state["pending_research"])
+        update["pending_research"] = []
+    if decision != "synthesize" and state.get("speculative_template"):
+        # Looping changes the plans, so the template designed ahead of time is not used
+        _discard_speculation(state["speculative_template"])
+        update["speculative_template"] = None
+    return update
 
 async def node_human_review(state: CTEState):
     global _human_input_queue
@@ -158,8 +225,8 @@ async def node_chaos_injection(state: CTEState):
         state.get("llm_config")
     )
     if new_plan:
-        return {"plans": state["plans"] + [new_plan], "iteration_count": state["iteration_count"] + 1, "logs": ["😈 [Chaos Agent] Injected Chaos."]}
-    return {"logs": ["⚠️ [Chaos Agent] Failed."]}
+        return _speculate_template(state, {"plans": state["plans"] + [new_plan], "iteration_count": state["iteration_count"] + 1, "logs": ["😈 [Chaos Agent] Injected Chaos."]})
+    return _speculate_template(state, {"logs": ["⚠️ [Chaos Agent] Failed."]})
 
 async def node_refiner(state: CTEState):
     refined_plans = await planner.refine_plans(
@@ -170,24 +237,35 @@ async def node_refiner(state: CTEState):
         state.get("human_feedback", ""),
         state.get("llm_config")
     )
-    return {"plans": refined_plans, "human_feedback": "", "iteration_count": state["iteration_count"] + 1, "logs": [f"🔧 [Refiner] Optimized plans."]}
+    return _speculate_template(state, {"plans": refined_plans, "human_feedback": "", "iteration_count": state["iteration_count"] + 1, "logs": [f"🔧 [Refiner] Optimized plans."]})
 
 async def node_template_designer(state: CTEState):
+    speculation = state.get("speculative_template")
+    if speculation is not None:
+        if speculation["key"] == _template_key(state, state["plans"]) and not speculation["task"].cancelled():
+            template = await speculation["task"]
+            SPECULATIVE_TEMPLATES.labels(outcome="hit").inc()
+            return {"report_template": template, "speculative_template": None, "logs": ["📐 [Architect] Reused speculatively designed report structure."]}
+        _discard_speculation(speculation)
+
     template = await template_architect.design_template(
         state["task"], 
         state.get("detected_nature", "General"), 
         state["plans"]
     )
-    return {"report_template": template, "logs": ["📐 [Architect] Designed dynamic report structure."]}
+    return {"report_template": template, "speculative_template": None, "logs": ["📐 [Architect] Designed dynamic report structure."]}
 
-async def node_synthesizer(state: CTEState):
+async def node_synthesizer(state: CTEState, writer: StreamWriter):
+    # Chunks go out on the "custom" stream as they arrive; the full text lands in state as before
     synthesis = await synthesizer.synthesize(
         state["task"], 
         state["plans"], 
         state["reviews"], 
         state["divergence_score"], 
         state.get("report_template", ""),
-        state.get("research_evidence", [])
+        state.get("research_evidence", []),
+        evidence_index=state.get("evidence_index"),
+        on_chunk=lambda chunk: writer({"type": "result_chunk", "data": chunk})
     )
     return {"synthesis": synthesis, "logs": ["⚗️ [Synthesizer] Strategic Brief generated."]}
 
@@ -207,31 +285,59 @@ async def node_storage(state: CTEState):
 def route_decision(state: CTEState):
     return state["router_decision"]
 
-def build_cte_graph():
+def build_research_branch():
+    """contradiction -> swarm as one subgraph, so the whole branch can overlap the critic."""
+    branch = StateGraph(CTEState, input_schema=ResearchBranchInput, output_schema=ResearchBranchOutput)
+    branch.add_node("contradiction", timed_node("contradiction", node_contradiction))
+    branch.add_node("swarm", timed_node("swarm", node_research_swarm))
+    branch.set_entry_point("contradiction")
+    branch.add_edge("contradiction", "swarm")
+    branch.add_edge("swarm", END)
+    return branch.compile()
+
+def build_cte_graph(parallel: bool = True):
+    """
+    parallel=True fans out after planner / refiner / chaos: the critic only needs the task
+    and the plans, so it runs concurrently with the research branch (contradiction -> swarm)
+    and both join at divergence. parallel=False keeps the strictly sequential pipeline.
+    Stream with subgraphs=True to see the research branch's node updates.
+    """
     workflow = StateGraph(CTEState)
     
-    workflow.add_node("configurator", node_configurator)
-    workflow.add_node("planner", node_planner)
-    workflow.add_node("contradiction", node_contradiction)
-    workflow.add_node("swarm", node_research_swarm)
-    workflow.add_node("critic", node_critic)
-    workflow.add_node("divergence", node_divergence)
-    workflow.add_node("router", node_router)
+    workflow.add_node("configurator", timed_node("configurator", node_configurator))
+    workflow.add_node("planner", timed_node("planner", node_planner))
+    if parallel:
+        workflow.add_node("research", build_research_branch())
+    else:
+        workflow.add_node("contradiction", timed_node("contradiction", node_contradiction))
+        workflow.add_node("swarm", timed_node("swarm", node_research_swarm))
+    workflow.add_node("critic", timed_node("critic", node_critic))
+    workflow.add_node("divergence", timed_node("divergence", node_divergence))
+    workflow.add_node("router", timed_node("router", node_router))
     
-    workflow.add_node("human_review", node_human_review)
-    workflow.add_node("chaos_agent", node_chaos_injection)
-    workflow.add_node("refiner", node_refiner)
+    workflow.add_node("human_review", timed_node("human_review", node_human_review))
+    workflow.add_node("chaos_agent", timed_node("chaos_agent", node_chaos_injection))
+    workflow.add_node("refiner", timed_node("refiner", node_refiner))
     
-    workflow.add_node("template_designer", node_template_designer)
-    workflow.add_node("synthesizer", node_synthesizer)
-    workflow.add_node("storage", node_storage)
+    workflow.add_node("template_designer", timed_node("template_designer", node_template_designer))
+    workflow.add_node("synthesizer", timed_node("synthesizer", node_synthesizer))
+    workflow.add_node("storage", timed_node("storage", node_storage))
     
     workflow.set_entry_point("configurator")
     workflow.add_edge("configurator", "planner")
-    workflow.add_edge("planner", "contradiction")
-    workflow.add_edge("contradiction", "swarm")
-    workflow.add_edge("swarm", "critic")
-    workflow.add_edge("critic", "divergence")
+    if parallel:
+        # Fan-out from every node that (re)writes plans; fan-in waits for both branches
+        for source in ["planner", "chaos_agent", "refiner"]:
+            workflow.add_edge(source, "research")
+            workflow.add_edge(source, "critic")
+        workflow.add_edge(["research", "critic"], "divergence")
+    else:
+        workflow.add_edge("planner", "contradiction")
+        workflow.add_edge("contradiction", "swarm")
+        workflow.add_edge("swarm", "critic")
+        workflow.add_edge("critic", "divergence")
+        workflow.add_edge("chaos_agent", "contradiction")
+        workflow.add_edge("refiner", "contradiction")
     workflow.add_edge("divergence", "router")
     
     workflow.add_conditional_edges(
@@ -246,12 +352,10 @@ def build_cte_graph():
     )
     
     workflow.add_edge("human_review", "refiner")
-    workflow.add_edge("chaos_agent", "contradiction")
-    workflow.add_edge("refiner", "contradiction")
     workflow.add_edge("template_designer", "synthesizer")
     workflow.add_edge("synthesizer", "storage")
     workflow.add_edge("storage", END)
     
     return workflow.compile()
 
-cte_graph = build_cte_graph()
\ No newline at end of file
+cte_graph = build_cte_graph(parallel=settings.GRAPH_PARALLEL)
\ No newline at end of file
@@ -0,0 +1,141 @@
+# FILE: cte_engine/llm_providers/embedding_cache.py
+from collections import OrderedDict
+from typing import List, Optional
+from util.metrics import CACHE_REQUESTS
+import numpy as np
+import hashlib
+import os
+import re
+
+try:
+    import fcntl
+except ImportError:  # Windows: single worker, appends are not locked
+    fcntl = None
+
+class EmbeddingCache:
+    """
+    content-hash -> float32 vector cache.
+
+    Tier 1 is a bounded in-process LRU. Tier 2 is an append-only file of fixed-size
+    records (32-byte sha256 key + float32 vector) that is memory-mapped for reads, so a
+    restarted worker starts warm and other workers can map the same file read-only.
+    Appends hold an exclusive flock and first cut off any torn trailing record (a writer
+    that crashed mid-append), so every record stays on an itemsize boundary.
+    """
+    def __init__(self, directory: str, model_name: str, dim: int, max_entries: int = 4096, readonly: bool = False):
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+        self.readonly = readonly
+        slug = re.sub(r"[^a-zA-Z0-9]+", "-", model_name).strip("-").lower()
+        # Model and dimension are part of the file name so a model change never mixes vectors
+        self.path = os.path.join(directory, f"{slug}-{dim}.f32")
+        self._dtype = np.dtype([("key", "u1", (32,)), ("vec", "<f4", (dim,))])
+        self._lru = OrderedDict()
+        self._index = {}
+        self._mmap = None
+        self._rows = 0
+
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+        self._refresh()
+        if self._rows:
+            print(f"💽 Embedding cache: {self._rows} vectors mapped from {self.path}")
+
+    def key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\x00{text}".encode("utf-8")).digest()
+
+    def _refresh(self):
+        """Maps rows appended since the last refresh (by this or any other worker)."""
+        if not os.path.exists(self.path):
+            return
+        rows = os.path.getsize(self.path) // self._dtype.itemsize
+        if rows <= self._rows:
+            return
+
+        # A torn trailing record (writer mid-append) is simply not mapped yet
+        self._mmap = np.memmap(self.path, dtype=self._dtype, mode="r", shape=(rows,))
+        keys = self._mmap["key"][self._rows:rows]
+        for offset in range(len(keys)):
+            self._index.setdefault(keys[offset].tobytes(), self._rows + offset)
+        self._rows = rows
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+            CACHE_REQUESTS.labels(cache="embedding", tier="memory", result="hit").inc()
+            return vector
+
+        row = self._index.get(key)
+        if row is not None:
+            vector = np.array(self._mmap["vec"][row], dtype=np.float32)
+            self._remember(key, vector)
+            CACHE_REQUESTS.labels(cache="embedding", tier="disk", result="hit").inc()
+            return vector
+        return None
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        keys = [self.key(t) for t in texts]
+        found = [self._lookup(k) for k in keys]
+
+        # Another worker may have appended the missing vectors since we last mapped the file
+        if any(v is None for v in found) and os.path.exists(self.path):
+            before = self._rows
+            self._refresh()
+            if self._rows > before:
+                found = [v if v is not None else self._lookup(k) for v, k in zip(found, keys)]
+
+        misses = sum(1 for v in found if v is None)
+        if misses:
+            CACHE_REQUESTS.labels(cache="embedding", tier="all", result="miss").inc(misses)
+        return found
+
+    def put_many(self, texts: List[str], vectors: List[np.ndarray]) -> Optional[bytes]:
+        """
+        Remembers the vectors in memory and returns the records the file is still missing,
+        for append() (None when there is nothing to write). Only the caller's thread touches
+        the in-memory state; the blocking append can then run in an executor.
+        """
+        records = []
+        pending = set()
+        for text, vector in zip(texts, vectors):
+            key = self.key(text)
+            vector = np.asarray(vector, dtype=np.float32)
+            self._remember(key, vector)
+            if key not in self._index and key not in pending:
+                pending.add(key)
+                records.append((np.frombuffer(key, dtype=np.uint8), vector))
+
+        if self.readonly or not records:
+            return None
+        block = np.empty(len(records), dtype=self._dtype)
+        for i, (key, vector) in enumerate(records):
+            block["key"][i] = key
+            block["vec"][i] = vector
+        return block.tobytes()
+
+    def append(self, data: bytes):
+        """Blocking file write. The new rows are mapped by the next refresh (get_many on a miss)."""
+        try:
+            with open(self.path, "ab") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    size = os.fstat(f.fileno()).st_size
+                    if size % self._dtype.itemsize:
+                        # Realign before appending, otherwise every later record would be shifted
+                        f.truncate(size - size % self._dtype.itemsize)
+                    f.write(data)
+                    f.flush()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+        except OSError as e:
+            print(f"⚠️ Embedding cache write failed: {e}")
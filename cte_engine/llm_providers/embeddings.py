@@ -1,6 +1,13 @@
 # FILE: cte_engine/llm_providers/embeddings.py
 from fastembed import TextEmbedding
+from llm_providers.embedding_cache import EmbeddingCache
+from util.config_loader import settings
+from util.metrics import EMBED_BATCH_SIZE
+from util.cancellation import check_cancelled
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
+import asyncio
+import functools
 from typing import List
 
 class LocalEmbeddingProvider:
@@ -8,26 +15,134 @@ class LocalEmbeddingProvider:
         # Uses standard "all-MiniLM-L6-v2" which is fast and free
         # First run will download model (~80MB) to local cache
         print("📥 Loading Local Embedding Model (all-MiniLM-L6-v2)...")
-        self.model = TextEmbedding(model_name="BAAI/bge-small-en-v1.5") 
+        self.model_name = "BAAI/bge-small-en-v1.5"
+        self.model = TextEmbedding(model_name=self.model_name) 
         self.vector_size = 384
         print("✅ Embedding Model Loaded.")
 
+        self.cache = None
+        if settings.EMBEDDING_CACHE_ENABLED:
+            try:
+                self.cache = EmbeddingCache(
+                    settings.EMBEDDING_CACHE_DIR,
+                    self.model_name,
+                    self.vector_size,
+                    max_entries=settings.EMBEDDING_CACHE_SIZE,
+                    readonly=settings.EMBEDDING_CACHE_READONLY,
+                )
+            except Exception as e:
+                print(f"⚠️ Embedding cache disabled: {e}")
+
+        # fastembed is synchronous and CPU-bound: it runs on a dedicated executor, never on the event loop
+        self._executor = ThreadPoolExecutor(max_workers=settings.EMBED_THREADS, thread_name_prefix="embed")
+        self.max_batch_size = settings.EMBED_MAX_BATCH_SIZE
+        self.max_wait = settings.EMBED_MAX_WAIT_MS / 1000.0
+
+        # Micro-batching queue for embed_text: (text, future) pairs waiting for the next flush
+        self._pending = []
+        self._flush_timer = None
+        # Strong references to running batches (the loop only keeps weak ones)
+        self._batches = set()
+
+    def _embed_sync(self, texts: List[str]) -> List[np.ndarray]:
+        # FastEmbed generators return numpy arrays
+        return list(self.model.embed(texts))
+
+    async def _run_model(self, texts: List[str]) -> List[np.ndarray]:
+        loop = asyncio.get_running_loop()
+        vectors = []
+        for i in range(0, len(texts), self.max_batch_size):
+            chunk = texts[i:i + self.max_batch_size]
+            EMBED_BATCH_SIZE.observe(len(chunk))
+            vectors.extend(await loop.run_in_executor(self._executor, self._embed_sync, chunk))
+        return vectors
+
     async def embed_text(self, text: str) -> List[float]:
-        """Generates embeddings locally on CPU."""
+        """
+        Generates embeddings locally on CPU. Concurrent calls arriving within
+        EMBED_MAX_WAIT_MS are coalesced into a single model invocation.
+        """
+        if self.cache:
+            cached = self.cache.get_many([text])[0]
+            if cached is not None:
+                return cached.tolist()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.max_wait, self._flush)
+
+        vector = await future
+        return vector.tolist()
+
+    def _flush(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._process_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(functools.partial(self._batch_done, batch))
+
+    def _batch_done(self, batch: list, task: asyncio.Task):
+        self._batches.discard(task)
+        # A batch cancelled (e.g. at shutdown) or crashed before resolving must not strand its waiters
+        error = None if task.cancelled() else task.exception()
+        for _, future in batch:
+            if future.done():
+                continue
+            if error is None:
+                future.cancel()
+            else:
+                future.set_exception(error)
+
+    async def _persist(self, texts: List[str], vectors: List[np.ndarray]):
+        data = self.cache.put_many(texts, vectors)
+        if data:
+            # flock + append is blocking file I/O; the default executor keeps it off the
+            # event loop without queueing behind model work on self._executor
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.append, data)
+
+    async def _process_batch(self, batch: list):
+        texts = list(dict.fromkeys(text for text, _ in batch))
         try:
-            # FastEmbed generators return numpy arrays
-            embeddings = list(self.model.embed([text]))
-            return embeddings[0].tolist()
+            fresh = dict(zip(texts, await self._run_model(texts)))
+            if self.cache:
+                await self._persist(texts, [fresh[t] for t in texts])
         except Exception as e:
             print(f"❌ Embedding Error: {e}")
-            return [0.0] * self.vector_size
+            # Zero vectors are placeholders and never written to the cache
+            fresh = {t: np.zeros(self.vector_size, dtype=np.float32) for t in texts}
+
+        for text, future in batch:
+            # The waiter may have been cancelled while the batch was running
+            if not future.done():
+                future.set_result(fresh[text])
 
     async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+
+        vectors = self.cache.get_many(texts) if self.cache else [None] * len(texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if not missing:
+            return [v.tolist() for v in vectors]
+
+        # Coalesced embed_text batches serve several runs and are never aborted; direct batches are
+        check_cancelled()
         try:
-            embeddings = list(self.model.embed(texts))
-            return [e.tolist() for e in embeddings]
+            fresh = dict(zip(missing, await self._run_model(missing)))
         except Exception as e:
             print(f"❌ Batch Embedding Error: {e}")
-            return [[0.0] * self.vector_size for _ in texts]
+            # Zero vectors are placeholders and never written to the cache
+            return [v.tolist() if v is not None else [0.0] * self.vector_size for v in vectors]
+
+        if self.cache:
+            await self._persist(list(fresh.keys()), list(fresh.values()))
+        return [(v if v is not None else fresh[t]).tolist() for t, v in zip(texts, vectors)]
 
-embedder = LocalEmbeddingProvider()
\ No newline at end of file
+embedder = LocalEmbeddingProvider()
@@ -3,16 +3,92 @@ from util.config_loader import settings
 import json
 import asyncio
 import random
+import re
+import time
 import traceback
+from collections import OrderedDict
+from util.metrics import track, LLM_LATENCY, LLM_ATTEMPT_LATENCY, LLM_BACKOFF, LLM_TTFT
+from util.cancellation import check_cancelled
+from storage.cache import TieredCache, content_key
+from llm_providers.rate_limiter import AdaptiveConcurrencyLimiter, TokenBucket
 from google.generativeai.types import HarmCategory, HarmBlockThreshold, GenerationConfig
 
+response_cache = TieredCache(
+    "llm",
+    max_entries=settings.LLM_CACHE_SIZE,
+    ttl=settings.LLM_CACHE_TTL,
+    use_redis=settings.LLM_CACHE_REDIS,
+)
+
+# --- Safety Settings ---
+# We attempt to allow everything, but Gemini may still block extreme content.
+SAFETY_SETTINGS = {
+    HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
+    HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
+}
+
+# Fallback responses shared by generate() and generate_stream() to ensure consistency
+FALLBACK_JSON = json.dumps({
+    "error": "Safety Block", 
+    "rationale": "The strategic plan was flagged by safety filters.",
+    "decision": "refine", # Safe default for router
+    "content": "Content Redacted due to Safety Policies."
+})
+FALLBACK_TEXT = "⚠️ [SYSTEM REDACTED] The generated content was flagged by safety filters. Please refine the directive."
+TIMEOUT_TEXT = "Error: Service unavailable (Timeout)."
+
+# Throttle signals that should shrink the concurrency limit (as opposed to plain transient errors)
+THROTTLE_MARKERS = {"429": "429", "quota": "429", "resource exhausted": "resource_exhausted", "503": "503"}
+
+# Max honoured server delay; anything longer is left to the caller's deadline
+MAX_RETRY_AFTER = 60.0
+
+def parse_retry_after(error: Exception):
+    """Extracts a server-suggested retry delay (RetryInfo detail, Retry-After header or message text)."""
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None and hasattr(delay, "seconds"):
+            return min(MAX_RETRY_AFTER, delay.seconds + getattr(delay, "nanos", 0) / 1e9)
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        header = headers.get("retry-after")
+        if header:
+            try:
+                return min(MAX_RETRY_AFTER, float(header))
+            except ValueError:
+                pass
+
+    message = str(error)
+    match = re.search(r"retry in ([0-9.]+)\s*s", message, re.IGNORECASE) or \
+        re.search(r"retry_delay\s*\{\s*seconds:\s*([0-9]+)", message)
+    if match:
+        return min(MAX_RETRY_AFTER, float(match.group(1)))
+    return None
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars/token) for the TPM budget; actual usage is settled after the call."""
+    return max(1, len(text) // 4)
+
 class GeminiProvider:
     def __init__(self):
         self.api_key = settings.GEMINI_API_KEY
         self.model_name = settings.DEFAULT_MODEL
         self.is_mock = False
-        # Semaphore to prevent hitting rate limits too aggressively in parallel
-        self._semaphore = asyncio.Semaphore(2) 
+        # Adaptive (AIMD) concurrency cap plus optional per-minute request/token budgets
+        self._limiter = AdaptiveConcurrencyLimiter(
+            initial=settings.GEMINI_INITIAL_CONCURRENCY,
+            min_limit=settings.GEMINI_MIN_CONCURRENCY,
+            max_limit=settings.GEMINI_MAX_CONCURRENCY,
+        )
+        self._rpm = TokenBucket("requests", settings.GEMINI_RPM)
+        self._tpm = TokenBucket("tokens", settings.GEMINI_TPM)
+        # GenerativeModel objects are reusable; we only see a handful of distinct configs per run
+        self._models = OrderedDict()
+        self._max_models = 16
 
         if not self.api_key:
             print("⚠️ GeminiProvider: API Key missing. Switching to MOCK MODE.")
@@ -24,128 +100,356 @@ class GeminiProvider:
                 print(f"⚠️ Gemini Configuration Error: {e}")
                 self.is_mock = True
 
-    async def generate(self, prompt: str, config: dict = None, json_mode: bool = False, **kwargs):
+    @staticmethod
+    def _normalize_config(config: dict) -> dict:
+        """Effective generation settings with defaults applied, so equal configs compare equal."""
+        return {
+            "temperature": config.get("temperature", 0.7),
+            "top_p": config.get("top_p", 0.95),
+            "top_k": config.get("top_k", 40),
+            "max_output_tokens": config.get("max_output_tokens", 8192),
+            "presence_penalty": config.get("presence_penalty", 0.0),
+            "frequency_penalty": config.get("frequency_penalty", 0.0),
+            "stop_sequences": list(config.get("stop_sequences", None) or []),
+        }
+
+    def _build_model(self, config: dict, json_mode: bool):
+        mime_type = "application/json" if json_mode else "text/plain"
+        try:
+            generation_config = GenerationConfig(**config, response_mime_type=mime_type)
+        except Exception:
+            # Fallback if specific config params are invalid for the model version
+            generation_config = GenerationConfig(temperature=0.7, max_output_tokens=8192, response_mime_type=mime_type)
+
+        return genai.GenerativeModel(
+            self.model_name,
+            generation_config=generation_config,
+            safety_settings=SAFETY_SETTINGS
+        )
+
+    def _get_model(self, config: dict, json_mode: bool):
+        """Bounded LRU of GenerativeModel instances keyed by the normalized config and json_mode."""
+        key = (json_mode, tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in sorted(config.items())))
+        try:
+            model = self._models.get(key)
+        except TypeError:
+            # Unhashable values (malformed LLM-suggested config); build without caching
+            return self._build_model(config, json_mode)
+        if model is not None:
+            self._models.move_to_end(key)
+            return model
+
+        model = self._build_model(config, json_mode)
+        self._models[key] = model
+        if len(self._models) > self._max_models:
+            self._models.popitem(last=False)
+        return model
+
+    def _should_cache(self, config: dict, cache) -> bool:
+        if self.is_mock or cache is False:
+            return False
+        if cache:
+            return True
+        threshold = settings.LLM_CACHE_MAX_TEMPERATURE
+        temperature = config["temperature"]
+        return threshold is not None and isinstance(temperature, (int, float)) and temperature <= threshold
+
+    async def generate(self, prompt: str, config: dict = None, json_mode: bool = False, cache: bool = None,
+                       deadline: float = None, **kwargs):
         """
         Generates content with robust error handling for Safety Blocks and Rate Limits.
+        cache=True/False opts a call site in or out of the response cache; None defers
+        to LLM_CACHE_MAX_TEMPERATURE. deadline is a budget in seconds for the whole call,
+        retries included (defaults to GEMINI_CALL_DEADLINE, 0 disables).
         """
+        if deadline is None: deadline = settings.GEMINI_CALL_DEADLINE
+        config = dict(config or {})
+        # Allow kwargs to override config
+        if 'temperature' in kwargs: config['temperature'] = kwargs['temperature']
+        config = self._normalize_config(config)
+
+        use_cache = self._should_cache(config, cache)
+        if use_cache:
+            key = content_key(self.model_name, config, json_mode, prompt)
+            cached = await response_cache.get(key)
+            if cached is not None:
+                with track(LLM_LATENCY, model=self.model_name) as t:
+                    t.outcome = "cache_hit"
+                return cached
+
+        with track(LLM_LATENCY, model=self.model_name) as t:
+            result = await self._generate(prompt, config, json_mode, deadline, t)
+
+        # Only clean answers are cached; blocks, errors and exhausted retries set an outcome
+        if use_cache and t.outcome is None:
+            await response_cache.put(key, result)
+        return result
+
+    def _settle_tokens(self, response, prompt_tokens: int):
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", 0) if usage else 0
+        if total:
+            self._tpm.consume(max(0, total - prompt_tokens))
+
+    async def _generate(self, prompt: str, config: dict, json_mode: bool, deadline: float, t: track):
         # --- 1. Handle Mock Mode ---
         if self.is_mock:
+            t.outcome = "mock"
             await asyncio.sleep(0.5)
             if json_mode: return json.dumps({"decision": "synthesize", "rationale": "Mock Response"})
             return "Mock response from CTE Engine."
 
-        # --- 2. Configuration Setup ---
-        if config is None: config = {}
-        # Allow kwargs to override config
-        if 'temperature' in kwargs: config['temperature'] = kwargs['temperature']
-
-        try:
-            generation_config = GenerationConfig(
-                temperature=config.get("temperature", 0.7),
-                top_p=config.get("top_p", 0.95),
-                top_k=config.get("top_k", 40),
-                max_output_tokens=config.get("max_output_tokens", 8192),
-                presence_penalty=config.get("presence_penalty", 0.0),
-                frequency_penalty=config.get("frequency_penalty", 0.0),
-                stop_sequences=config.get("stop_sequences", []),
-                response_mime_type="application/json" if json_mode else "text/plain"
-            )
-        except Exception:
-            # Fallback if specific config params are invalid for the model version
-            generation_config = GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=8192,
-                response_mime_type="application/json" if json_mode else "text/plain"
-            )
-
-        # --- 3. Safety Settings ---
-        # We attempt to allow everything, but Gemini may still block extreme content.
-        safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
-
-        model = genai.GenerativeModel(
-            self.model_name, 
-            generation_config=generation_config, 
-            safety_settings=safety_settings
-        )
+        # --- 2. Model Setup (cached per generation config) ---
+        model = self._get_model(config, json_mode)
 
-        # --- 4. Execution Loop with Retries ---
+        # --- 3. Execution Loop with Retries ---
         max_retries = 3
         attempt = 0
         
-        # Define the Fallback response here to ensure consistency
-        fallback_json = json.dumps({
-            "error": "Safety Block", 
-            "rationale": "The strategic plan was flagged by safety filters.",
-            "decision": "refine", # Safe default for router
-            "content": "Content Redacted due to Safety Policies."
-        })
-        fallback_text = "⚠️ [SYSTEM REDACTED] The generated content was flagged by safety filters. Please refine the directive."
-
-        async with self._semaphore:
+        fallback_json, fallback_text = FALLBACK_JSON, FALLBACK_TEXT
+
+        prompt_tokens = estimate_tokens(prompt)
+        deadline_at = time.monotonic() + deadline if deadline else None
+        retry_after = None
+
+        async def attempt_call():
+            # Rate budgets are paid before taking a slot: the slot is held only for the API
+            # call itself, never across a backoff or token-bucket sleep
+            await self._rpm.acquire(1)
+            await self._tpm.acquire(prompt_tokens)
+            async with self._limiter.slot():
+                # The run may have been abandoned while this call queued for tokens or a slot
+                check_cancelled()
+                return await model.generate_content_async(prompt)
+
+        while attempt < max_retries:
+            attempt_start = None
+            try:
+                # Server-provided retry delay wins, otherwise Exponential Backoff with Jitter
+                if attempt > 0:
+                    wait_time = retry_after if retry_after is not None else (2 ** attempt) + random.uniform(0, 1)
+                    if deadline_at is not None and time.monotonic() + wait_time >= deadline_at:
+                        print(f"⌛ Gemini retry in {wait_time:.2f}s would miss the deadline. Failing fast.")
+                        t.outcome = "deadline"
+                        return fallback_json if json_mode else TIMEOUT_TEXT
+                    print(f"⏳ Gemini Rate Limit hit. Retrying in {wait_time:.2f}s...")
+                    LLM_BACKOFF.labels(model=self.model_name).observe(wait_time)
+                    await asyncio.sleep(wait_time)
+
+                attempt_start = time.perf_counter()
+                if deadline_at is not None:
+                    response = await asyncio.wait_for(attempt_call(), timeout=max(0.0, deadline_at - time.monotonic()))
+                else:
+                    response = await attempt_call()
+                LLM_ATTEMPT_LATENCY.labels(model=self.model_name, outcome="ok").observe(time.perf_counter() - attempt_start)
+                attempt_start = None
+                self._limiter.on_success()
+                self._settle_tokens(response, prompt_tokens)
+                
+                # --- CRITICAL SAFETY CHECK START ---
+                
+                # Check 1: Prompt Feedback (Did the prompt itself trigger a block?)
+                if response.prompt_feedback and response.prompt_feedback.block_reason:
+                    print(f"🛑 Prompt Blocked! Reason: {response.prompt_feedback.block_reason}")
+                    t.outcome = "blocked"
+                    return fallback_json if json_mode else fallback_text
+
+                # Check 2: No Candidates Returned
+                if not response.candidates:
+                    print("⚠️ Gemini returned no candidates (Empty Response).")
+                    t.outcome = "blocked"
+                    return fallback_json if json_mode else fallback_text
+
+                candidate = response.candidates[0]
+
+                # Check 3: Finish Reason
+                # 1 = STOP (Success), 2 = MAX_TOKENS (Success but cut off)
+                # 3 = SAFETY, 4 = RECITATION (Copyright)
+                # See: https://ai.google.dev/api/python/google/generativeai/types/FinishReason
+                if candidate.finish_reason not in [1, 2]:
+                    print(f"⚠️ Gemini Generation Blocked. Finish Reason: {candidate.finish_reason} (3=Safety)")
+                    t.outcome = "blocked"
+                    # DO NOT RETRY on safety blocks (it will just block again)
+                    return fallback_json if json_mode else fallback_text
+
+                # Check 4: Valid Parts (The specific error you faced)
+                if not candidate.content or not candidate.content.parts:
+                    print("⚠️ Gemini Candidate has no content parts (Ghost Block).")
+                    t.outcome = "blocked"
+                    return fallback_json if json_mode else fallback_text
+
+                # --- CRITICAL SAFETY CHECK END ---
+
+                # If we passed all checks, it is safe to access .text
+                return response.text
+
+            except asyncio.TimeoutError:
+                print("⌛ Gemini call exceeded its deadline.")
+                t.outcome = "deadline"
+                return fallback_json if json_mode else TIMEOUT_TEXT
+
+            except Exception as e:
+                error_str = str(e).lower()
+                
+                # Retry only on specific transient errors
+                is_transient = any(x in error_str for x in ["429", "503", "quota", "resource exhausted", "internal error"])
+                if attempt_start is not None:
+                    LLM_ATTEMPT_LATENCY.labels(
+                        model=self.model_name, outcome="transient" if is_transient else "error"
+                    ).observe(time.perf_counter() - attempt_start)
+
+                throttle = next((reason for marker, reason in THROTTLE_MARKERS.items() if marker in error_str), None)
+                if throttle:
+                    self._limiter.on_throttle(throttle)
+                
+                if is_transient:
+                    retry_after = parse_retry_after(e)
+                    attempt += 1
+                    continue
+                else:
+                    print(f"❌ Gemini Critical Error: {str(e)}")
+                    t.outcome = "error"
+                    traceback.print_exc()
+                    return fallback_json if json_mode else f"System Error: {str(e)}"
+        
+        # If loop finishes without success
+        print("❌ Gemini Max Retries Exceeded.")
+        t.outcome = "exhausted"
+        return fallback_json if json_mode else TIMEOUT_TEXT
+
+    @staticmethod
+    def _chunk_text(chunk):
+        """Text of a streamed chunk, "" for an empty chunk, None if the stream was blocked."""
+        if chunk.prompt_feedback and chunk.prompt_feedback.block_reason:
+            return None
+        if not chunk.candidates:
+            return ""
+        candidate = chunk.candidates[0]
+        # 0 = UNSPECIFIED (still streaming), 1 = STOP, 2 = MAX_TOKENS
+        if candidate.finish_reason not in [0, 1, 2]:
+            return None
+        if not candidate.content or not candidate.content.parts:
+            return ""
+        return chunk.text
+
+    @staticmethod
+    async def _within(awaitable, deadline_at: float):
+        if deadline_at is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, timeout=max(0.0, deadline_at - time.monotonic()))
+
+    async def generate_stream(self, prompt: str, config: dict = None, deadline: float = None, **kwargs):
+        """
+        Streaming variant of generate() for text output. Yields chunks as they arrive.
+        Retries (with the slot released during backoff) only happen before the first chunk;
+        once text has been emitted a failure simply ends the stream.
+        """
+        if deadline is None: deadline = settings.GEMINI_CALL_DEADLINE
+        config = dict(config or {})
+        if 'temperature' in kwargs: config['temperature'] = kwargs['temperature']
+        config = self._normalize_config(config)
+
+        with track(LLM_LATENCY, model=self.model_name) as t:
+            if self.is_mock:
+                t.outcome = "mock"
+                for word in "Mock response from CTE Engine.".split(" "):
+                    await asyncio.sleep(0.1)
+                    yield word + " "
+                return
+
+            model = self._get_model(config, json_mode=False)
+            prompt_tokens = estimate_tokens(prompt)
+            deadline_at = time.monotonic() + deadline if deadline else None
+            start = time.perf_counter()
+            emitted = False
+            retry_after = None
+            max_retries = 3
+            attempt = 0
+
             while attempt < max_retries:
                 try:
-                    # Exponential Backoff with Jitter
                     if attempt > 0:
-                        wait_time = (2 ** attempt) + random.uniform(0, 1)
-                        print(f"⏳ Gemini Rate Limit hit. Retrying in {wait_time:.2f}s...")
+                        wait_time = retry_after if retry_after is not None else (2 ** attempt) + random.uniform(0, 1)
+                        if deadline_at is not None and time.monotonic() + wait_time >= deadline_at:
+                            print(f"⌛ Gemini stream retry in {wait_time:.2f}s would miss the deadline. Failing fast.")
+                            t.outcome = "deadline"
+                            yield TIMEOUT_TEXT
+                            return
+                        print(f"⏳ Gemini Rate Limit hit (stream). Retrying in {wait_time:.2f}s...")
+                        LLM_BACKOFF.labels(model=self.model_name).observe(wait_time)
                         await asyncio.sleep(wait_time)
 
-                    response = await model.generate_content_async(prompt)
-                    
-                    # --- CRITICAL SAFETY CHECK START ---
-                    
-                    # Check 1: Prompt Feedback (Did the prompt itself trigger a block?)
-                    if response.prompt_feedback and response.prompt_feedback.block_reason:
-                        print(f"🛑 Prompt Blocked! Reason: {response.prompt_feedback.block_reason}")
-                        return fallback_json if json_mode else fallback_text
-
-                    # Check 2: No Candidates Returned
-                    if not response.candidates:
-                        print("⚠️ Gemini returned no candidates (Empty Response).")
-                        return fallback_json if json_mode else fallback_text
-
-                    candidate = response.candidates[0]
-
-                    # Check 3: Finish Reason
-                    # 1 = STOP (Success), 2 = MAX_TOKENS (Success but cut off)
-                    # 3 = SAFETY, 4 = RECITATION (Copyright)
-                    # See: https://ai.google.dev/api/python/google/generativeai/types/FinishReason
-                    if candidate.finish_reason not in [1, 2]:
-                        print(f"⚠️ Gemini Generation Blocked. Finish Reason: {candidate.finish_reason} (3=Safety)")
-                        # DO NOT RETRY on safety blocks (it will just block again)
-                        return fallback_json if json_mode else fallback_text
-
-                    # Check 4: Valid Parts (The specific error you faced)
-                    if not candidate.content or not candidate.content.parts:
-                        print("⚠️ Gemini Candidate has no content parts (Ghost Block).")
-                        return fallback_json if json_mode else fallback_text
-
-                    # --- CRITICAL SAFETY CHECK END ---
-
-                    # If we passed all checks, it is safe to access .text
-                    return response.text
+                    await self._rpm.acquire(1)
+                    await self._tpm.acquire(prompt_tokens)
+                    async with self._limiter.slot():
+                        check_cancelled()
+                        # The deadline bounds opening the stream and every wait for the next chunk,
+                        # so a stalled stream cannot hold the slot indefinitely
+                        response = await self._within(model.generate_content_async(prompt, stream=True), deadline_at)
+                        chunks = response.__aiter__()
+                        while True:
+                            try:
+                                chunk = await self._within(chunks.__anext__(), deadline_at)
+                            except StopAsyncIteration:
+                                break
+                            text = self._chunk_text(chunk)
+                            if text is None:
+                                print("⚠️ Gemini Stream Blocked by safety filters.")
+                                t.outcome = "blocked"
+                                if not emitted:
+                                    yield FALLBACK_TEXT
+                                return
+                            if not text:
+                                continue
+                            if not emitted:
+                                LLM_TTFT.labels(model=self.model_name).observe(time.perf_counter() - start)
+                                emitted = True
+                            yield text
+
+                    self._limiter.on_success()
+                    self._settle_tokens(response, prompt_tokens)
+                    return
+
+                except asyncio.TimeoutError:
+                    print("⌛ Gemini stream exceeded its deadline.")
+                    t.outcome = "deadline"
+                    if not emitted:
+                        yield TIMEOUT_TEXT
+                    return
 
                 except Exception as e:
                     error_str = str(e).lower()
-                    
-                    # Retry only on specific transient errors
+                    throttle = next((reason for marker, reason in THROTTLE_MARKERS.items() if marker in error_str), None)
+                    if throttle:
+                        self._limiter.on_throttle(throttle)
+
                     is_transient = any(x in error_str for x in ["429", "503", "quota", "resource exhausted", "internal error"])
-                    
-                    if is_transient:
+                    if is_transient and not emitted:
+                        retry_after = parse_retry_after(e)
                         attempt += 1
                         continue
-                    else:
-                        print(f"❌ Gemini Critical Error: {str(e)}")
-                        traceback.print_exc()
-                        return fallback_json if json_mode else f"System Error: {str(e)}"
-            
-            # If loop finishes without success
-            print("❌ Gemini Max Retries Exceeded.")
-            return fallback_json if json_mode else "Error: Service unavailable (Timeout)."
-
-llm = GeminiProvider()
\ No newline at end of file
+
+                    print(f"❌ Gemini Stream Error: {str(e)}")
+                    t.outcome = "error"
+                    if not emitted:
+                        yield f"System Error: {str(e)}"
+                    return
+
+            print("❌ Gemini Max Retries Exceeded (stream).")
+            t.outcome = "exhausted"
+            yield TIMEOUT_TEXT
+
+def build_provider():
+    """Selects the live, recording or replay provider based on LLM_MODE."""
+    mode = settings.LLM_MODE.lower()
+    if mode == "replay":
+        from llm_providers.replay import ReplayProvider
+        return ReplayProvider(settings.LLM_CASSETTE_PATH, settings.LLM_REPLAY_LATENCY_SCALE)
+
+    provider = GeminiProvider()
+    if mode == "record":
+        from llm_providers.replay import RecordingProvider
+        return RecordingProvider(provider, settings.LLM_CASSETTE_PATH)
+    return provider
+
+llm = build_provider()
\ No newline at end of file
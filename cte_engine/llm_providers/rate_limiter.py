@@ -0,0 +1,112 @@
+# FILE: cte_engine/llm_providers/rate_limiter.py
+from contextlib import asynccontextmanager
+from util.metrics import LLM_CONCURRENCY_LIMIT, LLM_IN_FLIGHT, LLM_THROTTLE_EVENTS, LLM_RATE_WAIT
+import asyncio
+import math
+import time
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit: +increase per window of successful calls,
+    x decrease on a throttle signal (429 / 503 / resource exhausted).
+    """
+    def __init__(self, initial: int, min_limit: int, max_limit: int,
+                 increase: float = 1.0, decrease: float = 0.5, cooldown: float = 2.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        # Concurrent calls fail together; only the first throttle in a cooldown window cuts the limit
+        self.cooldown = cooldown
+        self._limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._last_cut = 0.0
+        self._cond = asyncio.Condition()
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(math.floor(self._limit)))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def acquire(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.limit)
+            self._in_flight += 1
+            LLM_IN_FLIGHT.set(self._in_flight)
+
+    async def release(self):
+        async with self._cond:
+            self._in_flight -= 1
+            LLM_IN_FLIGHT.set(self._in_flight)
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            await self.release()
+
+    def on_success(self):
+        # Spread the additive step over one "window" of calls (TCP-style congestion avoidance)
+        self._limit = min(float(self.max_limit), self._limit + self.increase / max(self._limit, 1.0))
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    def on_throttle(self, reason: str):
+        LLM_THROTTLE_EVENTS.labels(reason=reason).inc()
+        now = time.monotonic()
+        if now - self._last_cut < self.cooldown:
+            return
+        self._last_cut = now
+        old = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.decrease)
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+        if self.limit != old:
+            print(f"🚥 Gemini concurrency cut {old} -> {self.limit} ({reason})")
+
+class TokenBucket:
+    """
+    Per-minute budget (requests or tokens). capacity <= 0 disables the bucket.
+    consume() may push the balance negative to settle actual usage after a call.
+    """
+    def __init__(self, name: str, per_minute: int):
+        self.name = name
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        if not self.enabled:
+            return
+        amount = min(amount, self.capacity)
+        start = time.monotonic()
+        # The lock keeps waiters FIFO so a large request cannot be starved by small ones
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= amount
+        LLM_RATE_WAIT.labels(bucket=self.name).observe(time.monotonic() - start)
+
+    def consume(self, amount: float):
+        if not self.enabled:
+            return
+        self._refill()
+        self._tokens -= amount
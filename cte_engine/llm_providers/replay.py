@@ -0,0 +1,132 @@
+# FILE: cte_engine/llm_providers/replay.py
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+def prompt_hash(prompt: str, json_mode: bool = False) -> str:
+    """Stable key for a prompt. json_mode is part of it because it changes the response format."""
+    digest = hashlib.sha256()
+    digest.update(b"json" if json_mode else b"text")
+    digest.update(b"\x00")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()
+
+class RecordingProvider:
+    """
+    Wraps a live provider and appends every prompt/response pair (with latency)
+    to a JSONL cassette that ReplayProvider can serve back later.
+    """
+    def __init__(self, provider, cassette_path: str):
+        self.provider = provider
+        self.cassette_path = cassette_path
+        self.model_name = getattr(provider, "model_name", "unknown")
+        self.is_mock = getattr(provider, "is_mock", False)
+        self._lock = asyncio.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(cassette_path)), exist_ok=True)
+        print(f"📼 LLM Recording enabled -> {cassette_path}")
+
+    async def generate(self, prompt: str, config: dict = None, json_mode: bool = False, **kwargs):
+        start = time.perf_counter()
+        response = await self.provider.generate(prompt, config=config, json_mode=json_mode, **kwargs)
+        await self._record(prompt, config, json_mode, response, time.perf_counter() - start)
+        return response
+
+    async def generate_stream(self, prompt: str, config: dict = None, **kwargs):
+        # Recorded as a single response, so streamed and non-streamed calls replay interchangeably
+        start = time.perf_counter()
+        chunks = []
+        async for chunk in self.provider.generate_stream(prompt, config=config, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        await self._record(prompt, config, False, "".join(chunks), time.perf_counter() - start)
+
+    async def _record(self, prompt: str, config: dict, json_mode: bool, response: str, latency: float):
+        entry = {
+            "hash": prompt_hash(prompt, json_mode),
+            "json_mode": json_mode,
+            "config": config or {},
+            "latency": latency,
+            "prompt": prompt,
+            "response": response,
+        }
+        async with self._lock:
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+class ReplayProvider:
+    """
+    Serves recorded responses by prompt hash. Identical prompts recorded several
+    times are replayed in order (round-robin), so fan-out call sites keep their variety.
+    """
+    def __init__(self, cassette_path: str, latency_scale: float = 0.0):
+        self.cassette_path = cassette_path
+        self.latency_scale = latency_scale
+        self.model_name = "replay"
+        self.is_mock = True
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._cursor = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.cassette_path):
+            print(f"⚠️ ReplayProvider: Cassette not found at {self.cassette_path}. Every call will miss.")
+            return
+
+        count = 0
+        with open(self.cassette_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._entries.setdefault(entry["hash"], []).append(entry)
+                count += 1
+        print(f"📼 ReplayProvider: Loaded {count} recordings ({len(self._entries)} unique prompts).")
+
+    def rewind(self):
+        """Restart every prompt's round-robin so a repeated run replays the same sequence."""
+        self._cursor = {}
+
+    def _next_entry(self, prompt: str, json_mode: bool):
+        key = prompt_hash(prompt, json_mode)
+        recordings = self._entries.get(key)
+        if not recordings:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        idx = self._cursor.get(key, 0)
+        self._cursor[key] = idx + 1
+        return recordings[idx % len(recordings)]
+
+    async def generate(self, prompt: str, config: dict = None, json_mode: bool = False, **kwargs):
+        entry = self._next_entry(prompt, json_mode)
+        if entry is None:
+            if json_mode:
+                return json.dumps({"decision": "synthesize", "rationale": "Replay Miss"})
+            return "Replay miss: no recording for this prompt."
+
+        if self.latency_scale > 0:
+            await asyncio.sleep(entry.get("latency", 0.0) * self.latency_scale)
+        return entry["response"]
+
+    async def generate_stream(self, prompt: str, config: dict = None, chunk_size: int = 64, **kwargs):
+        """Replays the recorded response in fixed-size chunks, spreading the recorded latency across them."""
+        entry = self._next_entry(prompt, False)
+        response = entry["response"] if entry else "Replay miss: no recording for this prompt."
+        chunks = [response[i:i + chunk_size] for i in range(0, len(response), chunk_size)] or [""]
+
+        delay = 0.0
+        if entry and self.latency_scale > 0:
+            delay = entry.get("latency", 0.0) * self.latency_scale / len(chunks)
+        for chunk in chunks:
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
@@ -0,0 +1,129 @@
+# FILE: cte_engine/search/health.py
+from collections import deque
+from util.metrics import SEARCH_ENGINE_HEALTH, SEARCH_ENGINE_STATE
+import random
+import time
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+class EngineHealth:
+    def __init__(self, name: str, cooldown: float):
+        self.name = name
+        # Optimistic prior so untried engines still get traffic
+        self.success = 1.0
+        self.latency = None
+        self.captchas = deque()
+        self.failures = 0
+        self.open_until = 0.0
+        self.cooldown = cooldown
+        # When the half-open trial went out (0 while none is in flight)
+        self.trial_started = 0.0
+
+class EngineScoreboard:
+    """
+    Per-engine success-rate and latency EWMAs, recent CAPTCHA hits and a circuit breaker.
+    Engines rank by success / (1 + latency), divided by (1 + CAPTCHAs in the window).
+
+    A CAPTCHA opens the breaker at once; errors open it after `failure_threshold`
+    consecutive failures. After the cooldown a single trial request is let through at a
+    time (half-open): success closes the breaker, failure re-opens it with twice the cooldown.
+    Callers claim the trial with begin(); a trial never recorded stops counting after `trial_timeout`.
+    """
+    def __init__(self, engines: list, alpha: float = 0.3, failure_threshold: int = 3,
+                 cooldown: float = 60.0, max_cooldown: float = 900.0, captcha_window: float = 600.0,
+                 trial_timeout: float = 60.0):
+        self.alpha = alpha
+        self.trial_timeout = trial_timeout
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.captcha_window = captcha_window
+        self.engines = {e: EngineHealth(e, cooldown) for e in engines}
+        for e in engines:
+            self._publish(self.engines[e])
+
+    def _health(self, engine: str) -> EngineHealth:
+        if engine not in self.engines:
+            self.engines[engine] = EngineHealth(engine, self.base_cooldown)
+        return self.engines[engine]
+
+    def state(self, engine: str) -> str:
+        h = self._health(engine)
+        if not h.open_until:
+            return "closed"
+        return "open" if time.monotonic() < h.open_until else "half_open"
+
+    def _trial_in_flight(self, h: EngineHealth) -> bool:
+        return h.trial_started > 0 and time.monotonic() - h.trial_started < self.trial_timeout
+
+    def recent_captchas(self, engine: str) -> int:
+        h = self._health(engine)
+        cutoff = time.monotonic() - self.captcha_window
+        while h.captchas and h.captchas[0] < cutoff:
+            h.captchas.popleft()
+        return len(h.captchas)
+
+    def score(self, engine: str) -> float:
+        h = self._health(engine)
+        return h.success / (1.0 + (h.latency or 0.0)) / (1.0 + self.recent_captchas(engine))
+
+    def rank(self, engines: list) -> list:
+        """
+        Engines worth trying, best first. Ties break randomly to spread load; half-open engines
+        whose trial is still free go last.
+        """
+        shuffled = random.sample(engines, len(engines))
+        closed = [e for e in shuffled if self.state(e) == "closed"]
+        trials = [e for e in shuffled
+                  if self.state(e) == "half_open" and not self._trial_in_flight(self._health(e))]
+        return sorted(closed, key=self.score, reverse=True) + trials
+
+    def begin(self, engine: str) -> bool:
+        """Called right before a request. False if it would be a second concurrent half-open trial."""
+        if self.state(engine) != "half_open":
+            return True
+        h = self._health(engine)
+        if self._trial_in_flight(h):
+            return False
+        h.trial_started = time.monotonic()
+        return True
+
+    def record(self, engine: str, outcome: str, latency: float):
+        """outcome is "ok", "empty", "captcha", "error" or "slow" (a cancelled hedge; latency is a lower bound)."""
+        h = self._health(engine)
+        # Any outcome, even a cancelled hedge, ends the trial and frees the slot for the next one
+        h.trial_started = 0.0
+        if outcome == "slow":
+            # Says nothing about success or the breaker; it can only raise the latency estimate
+            if h.latency is None or latency > h.latency:
+                h.latency = latency if h.latency is None else h.latency + self.alpha * (latency - h.latency)
+            self._publish(h)
+            return
+        was_trial = self.state(engine) == "half_open"
+        sample = {"ok": 1.0, "empty": 0.5}.get(outcome, 0.0)
+        h.success += self.alpha * (sample - h.success)
+        h.latency = latency if h.latency is None else h.latency + self.alpha * (latency - h.latency)
+
+        if outcome in ("ok", "empty"):
+            # An empty answer is not the engine's fault; it neither trips nor extends the breaker
+            h.failures = 0
+            if was_trial or outcome == "ok":
+                h.open_until = 0.0
+                h.cooldown = self.base_cooldown
+        else:
+            h.failures += 1
+            if outcome == "captcha":
+                h.captchas.append(time.monotonic())
+            if outcome == "captcha" or was_trial or h.failures >= self.failure_threshold:
+                self._trip(h, escalate=was_trial)
+        self._publish(h)
+
+    def _trip(self, h: EngineHealth, escalate: bool):
+        if escalate:
+            h.cooldown = min(self.max_cooldown, h.cooldown * 2)
+        h.open_until = time.monotonic() + h.cooldown
+        print(f"🔌 Circuit open for '{h.name}' ({h.cooldown:.0f}s).")
+
+    def _publish(self, h: EngineHealth):
+        SEARCH_ENGINE_HEALTH.labels(engine=h.name).set(h.success)
+        SEARCH_ENGINE_STATE.labels(engine=h.name).set(BREAKER_STATES[self.state(h.name)])
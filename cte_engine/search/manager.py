@@ -1,38 +1,97 @@
-import httpx
 from util.config_loader import settings
+from util.http import http_clients
 import asyncio
 import random
+import time
 from llm_providers.gemini import llm
+from search.health import EngineScoreboard
+from storage.cache import TieredCache, content_key
+from util.metrics import track, SEARCH_LATENCY, SEARCH_JITTER
+
+class TrialInFlightError(Exception):
+    """The engine is half-open and another search is already running its trial request."""
+
+class SearchBlockedError(Exception):
+    """Engine answered with a CAPTCHA / rate-limit page instead of results."""
 
 class SearchManager:
     def __init__(self):
         self.searx_url = settings.SEARXNG_URL
         self.tavily_key = settings.TAVILY_API_KEY
-        self.client = httpx.AsyncClient(timeout=15.0)
         
         # Engines to rotate through if one fails (avoiding DDG as primary if it's blocking)
         self.engines = ["google", "bing", "brave", "qwant", "duckduckgo", "wikipedia"]
 
-    async def search(self, query: str, limit: int = 5):
-        # 1. Try SearxNG with Engine Rotation
+        # Results per (query, engine pool, limit), and engines recently seen blocking us
+        self.results_cache = TieredCache(
+            "search", max_entries=settings.SEARCH_CACHE_SIZE,
+            ttl=settings.SEARCH_CACHE_TTL, use_redis=settings.SEARCH_CACHE_REDIS
+        )
+        # Consulted for every engine of every search, so it stays in-process: a Redis tier
+        # would cost one round trip per engine before the first request goes out
+        self.blocked_engines = TieredCache(
+            "search_blocked", max_entries=len(self.engines) + 1,
+            ttl=settings.SEARCH_BLOCK_TTL, use_redis=False
+        )
+        self.health = EngineScoreboard(
+            self.engines,
+            failure_threshold=settings.SEARCH_BREAKER_FAILURES,
+            cooldown=settings.SEARCH_BREAKER_COOLDOWN,
+            max_cooldown=settings.SEARCH_BREAKER_MAX_COOLDOWN,
+        )
+        self.hedged = settings.SEARCH_HEDGED
+
+    def _cache_key(self, query: str, limit: int) -> str:
+        # Any engine in the pool answers the query equally well (the engine is kept in each
+        # result's "source"); changing the pool changes the key
+        normalized = " ".join(query.lower().split())
+        return content_key(normalized, self.engines, limit)
+
+    async def _block_engine(self, engine: str):
+        print(f"⛔ Engine '{engine}' blocked us; skipping it for {settings.SEARCH_BLOCK_TTL}s.")
+        await self.blocked_engines.put(engine, True)
+
+    async def search(self, query: str, limit: int = 5, allow_simulation: bool = True):
+        # 0. Same query answered recently (this or another run / iteration): no jitter, no request
+        cached = await self.results_cache.get(self._cache_key(query, limit))
+        if cached:
+            print(f"♻️ Search cache hit for: {query[:30]}...")
+            return cached
+
+        # 1. Try SearxNG, healthiest engines first
         try:
-            # Shuffle engines to distribute load
-            rotation = random.sample(self.engines, len(self.engines))
-            
+            # Open breakers and engines that recently blocked us are skipped outright
+            rotation = [e for e in self.health.rank(self.engines) if not self.blocked_engines.peek(e)]
+            failed = False
+
+            if self.hedged and len(rotation) >= 2:
+                results = await self._hedged_search(query, limit, rotation[:2])
+                if results:
+                    await self.results_cache.put(self._cache_key(query, limit), results)
+                    return results
+                rotation, failed = rotation[2:], True
+
             for engine in rotation:
                 try:
-                    # Add Jitter (Human-like delay) to prevent rate limits
-                    await asyncio.sleep(random.uniform(0.5, 1.5))
-                    
-                    print(f"🔍 Attempting search via {engine}...")
-                    results = await self._search_searxng(query, limit, engine)
-                    
+                    if failed:
+                        # Jitter (human-like delay) only between failures, to ease off a struggling instance
+                        jitter = random.uniform(0.5, 1.5)
+                        SEARCH_JITTER.labels(engine=engine).observe(jitter)
+                        await asyncio.sleep(jitter)
+
+                    results = await self._attempt(query, limit, engine)
                     if results:
+                        await self.results_cache.put(self._cache_key(query, limit), results)
                         return results
-                        
+                    failed = True
+
+                except TrialInFlightError:
+                    # Not a failure of this engine: no jitter, just move on
+                    continue
                 except Exception as e:
                     # If this engine fails (CAPTCHA), continue to the next loop
                     print(f"⚠️ Engine '{engine}' failed: {str(e)}. Rotating...")
+                    failed = True
                     continue
                     
         except Exception as e:
@@ -42,14 +101,67 @@ class SearchManager:
         if self.tavily_key:
             try:
                 print(f"🔄 Switching to Tavily for query: {query[:20]}...")
-                results = await self._search_tavily(query, limit)
-                if results: return results
+                with track(SEARCH_LATENCY, engine="tavily") as t:
+                    results = await self._search_tavily(query, limit)
+                    if not results: t.outcome = "empty"
+                if results:
+                    await self.results_cache.put(self._cache_key(query, limit), results)
+                    return results
             except Exception as e:
                 print(f"❌ Tavily failed: {e}")
         
-        # 3. CRITICAL FALLBACK: LLM Simulation
+        if not allow_simulation:
+            return []
+
+        # 3. CRITICAL FALLBACK: LLM Simulation (never cached as search results)
         print(f"⚠️ ALL SEARCH ENGINES FAILED. Engaging Semantic Simulation.")
-        return await self._simulate_search_result(query)
+        with track(SEARCH_LATENCY, engine="llm_simulation"):
+            return await self._simulate_search_result(query)
+
+    async def _attempt(self, query: str, limit: int, engine: str):
+        """One timed engine request; its outcome feeds the health scoreboard."""
+        if not self.health.begin(engine):
+            raise TrialInFlightError(f"'{engine}' trial already in flight")
+        print(f"🔍 Attempting search via {engine}...")
+        start = time.perf_counter()
+        with track(SEARCH_LATENCY, engine=engine) as t:
+            try:
+                results = await self._search_searxng(query, limit, engine)
+                t.outcome = "ok" if results else "empty"
+                return results
+            except SearchBlockedError:
+                t.outcome = "captcha"
+                await self._block_engine(engine)
+                raise
+            except asyncio.CancelledError:
+                # A losing hedge was at least this slow: recorded as a latency lower bound
+                # so an engine that keeps losing races is demoted
+                t.outcome = "slow"
+                raise
+            except Exception:
+                t.outcome = "error"
+                raise
+            finally:
+                if t.outcome:
+                    self.health.record(engine, t.outcome, time.perf_counter() - start)
+
+    async def _hedged_search(self, query: str, limit: int, engines: list):
+        """Races the given engines and returns the first non-empty answer; the rest are cancelled."""
+        tasks = [asyncio.create_task(self._attempt(query, limit, e)) for e in engines]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    results = await next_done
+                except Exception as e:
+                    print(f"⚠️ Hedged attempt failed: {e}")
+                    continue
+                if results:
+                    return results
+            return []
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     async def _search_searxng(self, query: str, limit: int, engine: str):
         # Explicitly request specific engine to bypass blocked ones
@@ -60,11 +172,11 @@ class SearchManager:
             "language": "en-US"
         }
         
-        resp = await self.client.get(f"{self.searx_url}/search", params=params)
+        resp = await http_clients.request("GET", f"{self.searx_url}/search", params=params)
         
         # Check for CAPTCHA/Rate Limit HTML responses disguised as 200 OK
-        if "CAPTCHA" in resp.text or "rate limit" in resp.text.lower():
-            raise Exception("Rate Limit/Captcha detected")
+        if resp.status_code == 429 or "CAPTCHA" in resp.text or "rate limit" in resp.text.lower():
+            raise SearchBlockedError("Rate Limit/Captcha detected")
             
         resp.raise_for_status()
         data = resp.json()
@@ -86,7 +198,8 @@ class SearchManager:
             "search_depth": "basic",
             "max_results": limit
         }
-        resp = await self.client.post(
+        resp = await http_clients.request(
+            "POST",
             "https://api.tavily.com/search",
             json=payload
         )
@@ -1,19 +1,15 @@
-import httpx
-from util.config_loader import settings
+from search.manager import search_manager
 
 class SearchEngine:
     async def search(self, query: str):
+        """
+        Grounding search for the planner. Goes through SearchManager so it shares the pooled
+        HTTP client, result cache and engine health; no LLM-simulated results here.
+        """
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(
-                    f"{settings.SEARXNG_URL}/search",
-                    params={"q": query, "format": "json"}
-                )
-                if resp.status_code == 200:
-                    return resp.json().get("results", [])[:3]
+            return await search_manager.search(query, limit=3, allow_simulation=False)
         except Exception:
             # Fallback logic logic would go here
             return []
-        return []
 
-search_engine = SearchEngine()
\ No newline at end of file
+search_engine = SearchEngine()
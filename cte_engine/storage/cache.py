@@ -0,0 +1,84 @@
+# FILE: cte_engine/storage/cache.py
+from collections import OrderedDict
+from util.metrics import CACHE_REQUESTS
+import hashlib
+import json
+import time
+
+def content_key(*parts) -> str:
+    """sha256 over JSON-normalized parts (dict keys sorted) so equal inputs always map to one key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, default=str)
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+class TieredCache:
+    """
+    Bounded in-process LRU in front of an optional Redis tier.
+    Both tiers honour the same TTL; Redis hits are promoted into the LRU.
+    """
+    def __init__(self, name: str, max_entries: int = 512, ttl: int = 3600, use_redis: bool = True):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.use_redis = use_redis
+        self._lru = OrderedDict()
+        self._redis = None
+
+    def _redis_client(self):
+        # Imported lazily so a process that never enables the tier never builds a Redis client
+        if self._redis is None:
+            from storage.redis import redis_client
+            self._redis = redis_client
+        return self._redis
+
+    def _redis_key(self, key: str) -> str:
+        return f"cte:{self.name}:{key}"
+
+    def _get_local(self, key: str):
+        entry = self._lru.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._lru[key]
+            return None
+        self._lru.move_to_end(key)
+        return value
+
+    def _put_local(self, key: str, value):
+        self._lru[key] = (time.monotonic() + self.ttl, value)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, key: str):
+        value = self._get_local(key)
+        if value is not None:
+            CACHE_REQUESTS.labels(cache=self.name, tier="memory", result="hit").inc()
+            return value
+
+        if self.use_redis:
+            value = await self._redis_client().get_json(self._redis_key(key))
+            if value is not None:
+                CACHE_REQUESTS.labels(cache=self.name, tier="redis", result="hit").inc()
+                self._put_local(key, value)
+                return value
+
+        CACHE_REQUESTS.labels(cache=self.name, tier="all", result="miss").inc()
+        return None
+
+    def peek(self, key: str):
+        """Memory tier only: no await, no Redis round trip and no hit/miss metrics."""
+        return self._get_local(key)
+
+    async def put(self, key: str, value):
+        self._put_local(key, value)
+        if self.use_redis:
+            await self._redis_client().set_json(self._redis_key(key), value, ttl=self.ttl)
+
+    def clear(self):
+        self._lru.clear()
@@ -1,10 +1,14 @@
 import redis.asyncio as redis
 from util.config_loader import settings
 import json
+import time
 
 class RedisManager:
     def __init__(self):
         self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        # When Redis is unreachable we stop trying for a while instead of paying a timeout per call
+        self._retry_after = 0.0
+        self._cooldown = 30.0
 
     async def cache_plan(self, key: str, plan_data: dict, ttl: int = 3600):
         await self.redis.setex(key, ttl, json.dumps(plan_data))
@@ -13,4 +17,35 @@ class RedisManager:
         data = await self.redis.get(key)
         return json.loads(data) if data else None
 
-redis_client = RedisManager()
\ No newline at end of file
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._retry_after
+
+    def _mark_down(self, e: Exception):
+        if self.available:
+            print(f"⚠️ Redis unavailable ({e}). Skipping Redis for {self._cooldown:.0f}s.")
+        self._retry_after = time.monotonic() + self._cooldown
+
+    async def get_json(self, key: str):
+        """Best-effort read. Returns None on miss or when Redis is down."""
+        if not self.available:
+            return None
+        try:
+            data = await self.redis.get(key)
+            return json.loads(data) if data else None
+        except Exception as e:
+            self._mark_down(e)
+            return None
+
+    async def set_json(self, key: str, value, ttl: int = 3600):
+        """Best-effort write. Failures are swallowed, Redis is only a cache tier."""
+        if not self.available:
+            return False
+        try:
+            await self.redis.setex(key, ttl, json.dumps(value))
+            return True
+        except Exception as e:
+            self._mark_down(e)
+            return False
+
+redis_client = RedisManager()
@@ -1,90 +1,157 @@
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, models
 from util.config_loader import settings
 from llm_providers.embeddings import embedder
 import uuid
 import datetime
 import asyncio
+from util.metrics import track, VECTORDB_LATENCY
 
 class VectorDBManager:
     def __init__(self):
-        self.client = QdrantClient(url=settings.QDRANT_URL)
+        self.client = self._build_client()
         self.collection_name = "reasoning_evidence"
         self.vector_size = embedder.vector_size
-        self._ensure_collection()
+        self.timeout = settings.QDRANT_TIMEOUT
+        # The collection check needs the event loop, so it runs lazily on first use
+        self._ready = False
+        self._init_lock = asyncio.Lock()
 
-    def _ensure_collection(self):
+    def _build_client(self):
+        """
+        QDRANT_URL is either a server URL, ":memory:" (in-process, for offline runs)
+        or a filesystem path (embedded local mode).
+        """
+        url = settings.QDRANT_URL
+        if url == ":memory:":
+            return AsyncQdrantClient(location=":memory:")
+        if not url.startswith(("http://", "https://")):
+            return AsyncQdrantClient(path=url)
+
+        # One pooled, keep-alive connection set per process (REST), or gRPC if preferred
+        return AsyncQdrantClient(
+            url=url,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            timeout=int(settings.QDRANT_TIMEOUT),
+            pool_size=settings.QDRANT_POOL_SIZE,
+        )
+
+    async def _call(self, coro):
+        """Per-call timeout on every Qdrant request."""
+        return await asyncio.wait_for(coro, timeout=self.timeout)
+
+    async def _ensure_collection(self):
+        if self._ready:
+            return
+        async with self._init_lock:
+            if self._ready:
+                return
+            try:
+                if not await self._call(self.client.collection_exists(self.collection_name)):
+                    await self._call(self.client.create_collection(
+                        collection_name=self.collection_name,
+                        vectors_config=models.VectorParams(
+                            size=self.vector_size,
+                            distance=models.Distance.COSINE
+                        )
+                    ))
+                self._ready = True
+            except Exception as e:
+                print(f"⚠️ VectorDB Init Error: {e}")
+
+    async def close(self):
         try:
-            collections = self.client.get_collections()
-            if self.collection_name not in [c.name for c in collections.collections]:
-                self.client.create_collection(
-                    collection_name=self.collection_name,
-                    vectors_config=models.VectorParams(
-                        size=self.vector_size, 
-                        distance=models.Distance.COSINE
-                    )
-                )
+            await self.client.close()
         except Exception as e:
-            print(f"⚠️ VectorDB Init Error: {e}")
+            print(f"⚠️ VectorDB Close Error: {e}")
 
-    async def store_artifact(self, text: str, metadata: dict):
-        try:
-            vector = await embedder.embed_text(text)
-            point_id = str(uuid.uuid4())
-            
-            # Run sync client in thread
-            await asyncio.to_thread(
-                self.client.upsert,
-                collection_name=self.collection_name,
-                points=[
-                    models.PointStruct(
-                        id=point_id,
-                        vector=vector,
-                        payload={
-                            "content": text,
-                            "timestamp": datetime.datetime.utcnow().isoformat(),
-                            **metadata
-                        }
-                    )
-                ]
-            )
+    async def store_artifact(self, text: str, metadata: dict, point_id: str = None):
+        with track(VECTORDB_LATENCY, operation="store_artifact") as t:
+            point_id = (await self._store_artifacts([(text, metadata)], [point_id] if point_id else None))[0]
+            if point_id is None: t.outcome = "error"
             return point_id
+
+    async def store_artifacts(self, items: list, ids: list = None):
+        """
+        Bulk ingestion: one embedding batch for all (text, metadata) pairs, then
+        upserts in chunks of QDRANT_UPSERT_BATCH. Returns point ids in input order.
+        With deterministic ids (UUID strings) re-storing the same item overwrites its point.
+        """
+        if not items:
+            return []
+        with track(VECTORDB_LATENCY, operation="store_artifacts") as t:
+            point_ids = await self._store_artifacts(items, ids)
+            if any(pid is None for pid in point_ids): t.outcome = "error"
+            return point_ids
+
+    async def _store_artifacts(self, items: list, ids: list = None):
+        try:
+            await self._ensure_collection()
+            vectors = await embedder.embed_batch([text for text, _ in items])
+            timestamp = datetime.datetime.utcnow().isoformat()
+            ids = ids or [str(uuid.uuid4()) for _ in items]
+            points = [
+                models.PointStruct(
+                    id=point_id,
+                    vector=vector,
+                    payload={
+                        "content": text,
+                        "timestamp": timestamp,
+                        **metadata
+                    }
+                )
+                for (text, metadata), vector, point_id in zip(items, vectors, ids)
+            ]
+
+            batch_size = max(1, settings.QDRANT_UPSERT_BATCH)
+            for i in range(0, len(points), batch_size):
+                await self._call(self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=points[i:i + batch_size]
+                ))
+            return [p.id for p in points]
         except Exception as e:
             print(f"❌ Vector Store Error: {e}")
-            return None
+            return [None] * len(items)
 
     async def search_relevant(self, query: str, limit: int = 5):
         """
         Performs semantic search to find the most relevant evidence chunks.
         """
+        with track(VECTORDB_LATENCY, operation="search_relevant"):
+            return await self._search_relevant(query, limit)
+
+    async def _search_relevant(self, query: str, limit: int):
         try:
+            await self._ensure_collection()
             # Generate embedding for the search query (Task + Plan context)
             query_vector = await embedder.embed_text(query)
-            
-            results = await asyncio.to_thread(
-                self.client.search,
+
+            response = await self._call(self.client.query_points(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
+                query=query_vector,
                 limit=limit,
+                with_payload=True,
                 score_threshold=0.40  # Filter out completely irrelevant noise (low cosine sim)
-            )
-            
+            ))
+
             cleaned_results = []
-            for hit in results:
+            for hit in response.points:
                 payload = hit.payload
                 # Fallback if metadata is missing
                 meta = {k:v for k,v in payload.items() if k != "content"}
                 if "url" not in meta: meta["url"] = "internal_memory"
-                
+
                 cleaned_results.append({
                     "content": payload.get("content", ""),
                     "metadata": meta,
                     "score": hit.score
                 })
-                
+
             return cleaned_results
-            
+
         except Exception as e:
             print(f"❌ Vector Search Error: {e}")
             return []
 
-vector_db = VectorDBManager()
\ No newline at end of file
+vector_db = VectorDBManager()
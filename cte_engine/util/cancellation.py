@@ -0,0 +1,81 @@
+# FILE: cte_engine/util/cancellation.py
+from typing import Optional
+import asyncio
+import contextvars
+
+_current_scope = contextvars.ContextVar("cte_run_scope", default=None)
+
+class RunScope:
+    """
+    Cancellation scope of one analysis run.
+
+    The graph runs in the scope's root task, so cancelling it unwinds every node and the
+    gathers inside them. Work that outlives the node that started it (swarm stragglers,
+    speculative templates, background stores) is created with spawn() so cancel() reaches
+    it as well. Providers call check_cancelled() before issuing billable work, which also
+    covers tasks created outside the root task but inside the run's context.
+    """
+    def __init__(self):
+        self.reason = None
+        self._root = None
+        self._tasks = set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def start(self, coro) -> asyncio.Task:
+        """Runs coro as the root task; everything it awaits or creates sees this scope."""
+        token = _current_scope.set(self)
+        try:
+            self._root = asyncio.create_task(coro)
+        finally:
+            _current_scope.reset(token)
+        return self._root
+
+    def spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        if self.cancelled:
+            task.cancel()
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def cancel(self, reason: str = "cancelled"):
+        if self.reason is None:
+            self.reason = reason
+        self.close()
+
+    def close(self):
+        """Cancels whatever is still running without marking the run as cancelled (e.g. after it finished)."""
+        for task in self._running():
+            task.cancel()
+
+    async def wait(self, timeout: float) -> bool:
+        """Waits at most timeout for the scope's tasks to unwind. False if some are still running."""
+        running = self._running()
+        if not running:
+            return True
+        _, pending = await asyncio.wait(running, timeout=timeout)
+        return not pending
+
+    def check(self):
+        if self.reason is not None:
+            raise asyncio.CancelledError(self.reason)
+
+    def _running(self) -> list:
+        return [t for t in [self._root, *self._tasks] if t is not None and not t.done()]
+
+def current_scope() -> Optional[RunScope]:
+    return _current_scope.get()
+
+def spawn(coro) -> asyncio.Task:
+    """asyncio.create_task bound to the current run's scope (a plain task outside a run)."""
+    scope = _current_scope.get()
+    return scope.spawn(coro) if scope is not None else asyncio.create_task(coro)
+
+def check_cancelled():
+    """Raises CancelledError if the current run has been cancelled."""
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.check()
@@ -1,6 +1,6 @@
 # FILE: cte_engine/util/config_loader.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, Optional
 from pathlib import Path
 import os
 
@@ -23,6 +23,92 @@ class Settings(BaseSettings):
     # System
     DEFAULT_MODEL: str = "gemini-2.0-flash"
 
+    # Outbound HTTP (one pooled client per process; HTTP_HOST_TIMEOUTS is JSON, e.g. {"api.tavily.com": 30})
+    HTTP2: bool = True
+    HTTP_TIMEOUT: float = 15.0
+    HTTP_CONNECT_TIMEOUT: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 64
+    HTTP_MAX_KEEPALIVE: int = 16
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_HOST_TIMEOUTS: Dict[str, float] = {}
+
+    # Vector Store (QDRANT_URL may also be ":memory:" or a local path for offline runs)
+    QDRANT_UPSERT_BATCH: int = 256
+    QDRANT_TIMEOUT: float = 10.0
+    QDRANT_POOL_SIZE: int = 16
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6344
+
+    # LLM Record / Replay ("live", "record" or "replay")
+    LLM_MODE: str = "live"
+    LLM_CASSETTE_PATH: str = str(BASE_DIR / "bench" / "cassettes" / "default.jsonl")
+    LLM_REPLAY_LATENCY_SCALE: float = 0.0  # 0 = instant, 1.0 = recorded latency
+
+    # Gemini Rate Control (AIMD concurrency + per-minute budgets, 0 = unlimited)
+    GEMINI_INITIAL_CONCURRENCY: int = 2
+    GEMINI_MIN_CONCURRENCY: int = 1
+    GEMINI_MAX_CONCURRENCY: int = 16
+    GEMINI_RPM: int = 0
+    GEMINI_TPM: int = 0
+    GEMINI_CALL_DEADLINE: float = 120.0  # seconds per generate() call, retries included
+
+    # Embedding Cache (in-process LRU + append-only memory-mapped store shared by workers)
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_DIR: str = str(BASE_DIR / ".cache" / "embeddings")
+    EMBEDDING_CACHE_SIZE: int = 4096
+    EMBEDDING_CACHE_READONLY: bool = False
+
+    # Embedding Executor (micro-batching of concurrent embed_text calls)
+    EMBED_THREADS: int = 1
+    EMBED_MAX_BATCH_SIZE: int = 64
+    EMBED_MAX_WAIT_MS: float = 5.0
+
+    # LLM Response Cache (opt-in per call site, or automatic at/below the temperature threshold)
+    LLM_CACHE_SIZE: int = 512
+    LLM_CACHE_TTL: int = 86400
+    LLM_CACHE_REDIS: bool = True
+    LLM_CACHE_MAX_TEMPERATURE: Optional[float] = None
+
+    # Search Result Cache (LRU + optional Redis). Engines that answer with a CAPTCHA or
+    # rate limit are skipped for SEARCH_BLOCK_TTL seconds.
+    SEARCH_CACHE_SIZE: int = 1024
+    SEARCH_CACHE_TTL: int = 3600
+    SEARCH_CACHE_REDIS: bool = True
+    SEARCH_BLOCK_TTL: int = 300
+
+    # Search Engine Health (EWMA scoreboard + circuit breakers). Hedged mode races the
+    # two healthiest engines and keeps the first non-empty answer.
+    SEARCH_HEDGED: bool = False
+    SEARCH_BREAKER_FAILURES: int = 3
+    SEARCH_BREAKER_COOLDOWN: float = 60.0
+    SEARCH_BREAKER_MAX_COOLDOWN: float = 900.0
+
+    # Graph Topology (parallel: critic runs alongside contradiction -> swarm and joins at divergence)
+    GRAPH_PARALLEL: bool = True
+
+    # Run Cancellation: how long a disconnect waits for the run's in-flight work to unwind
+    # before the aborted runbook is saved regardless
+    RUN_CANCEL_TIMEOUT: float = 5.0
+
+    # Speculative Template Design: start the report template in the background while the pass that
+    # will probably end in synthesis is still running. "off", "last_iteration" (only when the router's
+    # hard stop makes synthesis certain, never wasted) or "likely" (also when the previous divergence
+    # sat in the stable band; a loop decision cancels the call).
+    SPECULATIVE_TEMPLATE: str = "off"
+
+    # Research Swarm Scheduling (agents run highest priority first; 0 budget = wait for all).
+    # Stragglers past the budget keep running for the next iteration ("background") or are cancelled ("cancel").
+    SWARM_CONCURRENCY: int = 2
+    SWARM_BUDGET_SECONDS: float = 30.0
+    SWARM_STRAGGLERS: str = "background"
+
+    # Evidence Dedup (SimHash near-duplicate threshold, in differing bits out of 64)
+    EVIDENCE_SIMHASH_DISTANCE: int = 6  # snippets are short; unrelated ones sit around 18+ bits apart
+
+    # Memoization of critic reviews and per-plan score components (keyed by content hash)
+    CRITIC_MEMO_SIZE: int = 256
+    SCORE_MEMO_SIZE: int = 512
+
     model_config = SettingsConfigDict(
         env_file=str(ENV_PATH),
         env_file_encoding='utf-8',
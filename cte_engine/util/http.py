@@ -0,0 +1,59 @@
+# FILE: cte_engine/util/http.py
+from urllib.parse import urlparse
+from util.config_loader import settings
+from util.cancellation import check_cancelled
+import importlib.util
+import httpx
+
+class HTTPClientRegistry:
+    """
+    Process-wide pooled httpx clients: keep-alive connections are reused across calls
+    instead of a TCP/TLS handshake per request. HTTP/2 is used when `h2` is installed.
+    Opened on app startup, closed on shutdown; a client used before startup is created lazily.
+    """
+    def __init__(self):
+        self._clients = {}
+        self.http2 = settings.HTTP2 and importlib.util.find_spec("h2") is not None
+
+    def _build(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    def client(self, name: str = "default") -> httpx.AsyncClient:
+        c = self._clients.get(name)
+        if c is None or c.is_closed:
+            c = self._clients[name] = self._build()
+        return c
+
+    def timeout_for(self, url: str) -> httpx.Timeout:
+        """Per-host read timeout from HTTP_HOST_TIMEOUTS (host -> seconds), else the default."""
+        host = urlparse(url).hostname or ""
+        seconds = settings.HTTP_HOST_TIMEOUTS.get(host, settings.HTTP_TIMEOUT)
+        return httpx.Timeout(seconds, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+    async def request(self, method: str, url: str, client: str = "default", **kwargs) -> httpx.Response:
+        # Abandoned runs issue no further outbound requests
+        check_cancelled()
+        kwargs.setdefault("timeout", self.timeout_for(url))
+        return await self.client(client).request(method, url, **kwargs)
+
+    async def startup(self):
+        self.client()
+        print(f"🌐 HTTP client pool ready (http2={'on' if self.http2 else 'off'})")
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for c in clients:
+            try:
+                await c.aclose()
+            except Exception as e:
+                print(f"⚠️ HTTP Client Close Error: {e}")
+
+http_clients = HTTPClientRegistry()
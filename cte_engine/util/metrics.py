@@ -0,0 +1,173 @@
+# FILE: cte_engine/util/metrics.py
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+import asyncio
+import functools
+import time
+
+# Buckets span sub-second CPU work up to multi-retry LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+NODE_LATENCY = Histogram(
+    "cte_node_duration_seconds",
+    "Wall-clock time spent in each OODA graph node.",
+    ["node", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_LATENCY = Histogram(
+    "cte_llm_request_duration_seconds",
+    "End-to-end GeminiProvider.generate latency, including retries and backoff.",
+    ["model", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_ATTEMPT_LATENCY = Histogram(
+    "cte_llm_attempt_duration_seconds",
+    "Latency of a single Gemini API attempt.",
+    ["model", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_TTFT = Histogram(
+    "cte_llm_time_to_first_token_seconds",
+    "Time from a streaming Gemini request until the first text chunk.",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_BACKOFF = Histogram(
+    "cte_llm_backoff_seconds",
+    "Time slept between Gemini retries.",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+
+SEARCH_LATENCY = Histogram(
+    "cte_search_attempt_duration_seconds",
+    "Latency of a single search engine attempt.",
+    ["engine", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+SEARCH_JITTER = Histogram(
+    "cte_search_jitter_seconds",
+    "Deliberate delay slept before a search engine attempt.",
+    ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+
+SEARCH_ENGINE_HEALTH = Gauge(
+    "cte_search_engine_success_ewma",
+    "Success-rate EWMA per search engine (1.0 = every recent attempt returned results).",
+    ["engine"],
+)
+
+SEARCH_ENGINE_STATE = Gauge(
+    "cte_search_engine_breaker_state",
+    "Circuit breaker per search engine: 0 closed, 1 half-open, 2 open.",
+    ["engine"],
+)
+
+VECTORDB_LATENCY = Histogram(
+    "cte_vectordb_duration_seconds",
+    "Latency of VectorDBManager operations (embedding included).",
+    ["operation", "outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "cte_llm_concurrency_limit",
+    "Current adaptive (AIMD) concurrency limit for Gemini calls.",
+)
+
+LLM_IN_FLIGHT = Gauge(
+    "cte_llm_in_flight",
+    "Gemini calls currently holding a concurrency slot.",
+)
+
+LLM_THROTTLE_EVENTS = Counter(
+    "cte_llm_throttle_events_total",
+    "Throttle signals (429/503/resource exhausted) received from Gemini.",
+    ["reason"],
+)
+
+LLM_RATE_WAIT = Histogram(
+    "cte_llm_rate_limit_wait_seconds",
+    "Time spent waiting on the requests/tokens per minute buckets.",
+    ["bucket"],
+    buckets=LATENCY_BUCKETS,
+)
+
+EMBED_BATCH_SIZE = Histogram(
+    "cte_embedding_batch_size",
+    "Texts per embedding model invocation (after coalescing).",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+CACHE_REQUESTS = Counter(
+    "cte_cache_requests_total",
+    "Cache lookups by cache name, tier and result.",
+    ["cache", "tier", "result"],
+)
+
+SWARM_STRAGGLERS = Counter(
+    "cte_swarm_stragglers_total",
+    "Research agents still running when the swarm budget ran out, by what happened to them.",
+    ["action"],
+)
+
+CRITIC_CALLS_SKIPPED = Counter(
+    "cte_critic_calls_skipped_total",
+    "Meta-critic LLM calls skipped because the plan was reviewed unchanged before.",
+)
+
+SPECULATIVE_TEMPLATES = Counter(
+    "cte_speculative_templates_total",
+    "Report templates designed speculatively, by outcome (hit = reused by the synthesis path, wasted = cancelled or stale).",
+    ["outcome"],
+)
+
+RUNS_ABORTED = Counter(
+    "cte_runs_aborted_total",
+    "Analysis runs cancelled before completion, by reason.",
+    ["reason"],
+)
+
+RUN_CANCEL_DURATION = Histogram(
+    "cte_run_cancel_duration_seconds",
+    "Time from cancelling a run until all of its tasks had unwound.",
+    buckets=LATENCY_BUCKETS,
+)
+
+class track:
+    """
+    Times a block into a histogram. The outcome label defaults to "ok"/"error"
+    and can be overridden inside the block (e.g. t.outcome = "blocked").
+    """
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.outcome = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, (asyncio.CancelledError, GeneratorExit)):
+            outcome = self.outcome or "cancelled"
+        else:
+            outcome = self.outcome or ("error" if exc_type else "ok")
+        self.histogram.labels(**self.labels, outcome=outcome).observe(time.perf_counter() - self._start)
+        return False
+
+def timed_node(name: str, fn):
+    """Wraps a graph node so every invocation lands in NODE_LATENCY."""
+    @functools.wraps(fn)
+    async def wrapper(state, **kwargs):
+        with track(NODE_LATENCY, node=name):
+            return await fn(state, **kwargs)
+    return wrapper
+
+def render_latest():
+    return generate_latest(), CONTENT_TYPE_LATEST